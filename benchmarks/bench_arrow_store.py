@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pyd2m.store import DSArrow, DSCsv, DSFeather, DSParquet
+
+STORES = [("csv", DSCsv()), ("parquet", DSParquet()), ("feather", DSFeather()), ("arrow", DSArrow())]
+
+
+def make_frame(n, seed=0):
+    rnd = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "BoxID": np.arange(n).astype(str),
+        "Position": rnd.integers(0, 3000, size=n),
+        "Weight": rnd.random(size=n) * 30,
+        "Time": pd.to_datetime("2019") + pd.to_timedelta(rnd.integers(0, 86400 * 30, size=n), unit="s"),
+    })
+
+
+def rss():
+    usage = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon", "RssFile")):
+                name, value, _ = line.split()
+                usage[name.rstrip(":")] = int(value) * 1024
+    return usage
+
+
+def load_in_child(name, path):
+    store = dict(STORES)[name]
+    before = rss()
+    start = time.perf_counter()
+    data = store.load(path, None)
+    data["Position"].sum()
+    elapsed = time.perf_counter() - start
+    after = rss()
+    return elapsed, {k: after[k] - before.get(k, 0) for k in after}
+
+
+def run(n=2000000):
+    df = make_frame(n)
+    results = {}
+    with tempfile.TemporaryDirectory() as base:
+        for name, store in STORES:
+            path = os.path.join(base, "data." + name)
+            start = time.perf_counter()
+            store.dump(path, df, None)
+            write = time.perf_counter() - start
+            with ProcessPoolExecutor(1) as pool:
+                read, memory = pool.submit(load_in_child, name, path).result()
+            results[name] = {
+                "write_rows_per_s": n / write,
+                "read_rows_per_s": n / read,
+                "rss_anon_mb": memory.get("RssAnon", 0) / 2 ** 20,
+                "rss_file_mb": memory.get("RssFile", 0) / 2 ** 20,
+                "size_mb": os.path.getsize(path) / 2 ** 20,
+            }
+    return results
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        print("{:>8}: write {write_rows_per_s:12,.0f} rows/s, read {read_rows_per_s:12,.0f} rows/s, "
+              "private {rss_anon_mb:7.1f} MB, shared {rss_file_mb:7.1f} MB, file {size_mb:7.1f} MB"
+              .format(name, **result))
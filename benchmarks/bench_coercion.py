@@ -0,0 +1,60 @@
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from pyd2m.coercion import CoercionPlan
+
+KINDS = ["int", "float", "str", "datetime64[s]", "bytes"]
+
+
+def make_fields(n_columns):
+    return {"c{}".format(i): KINDS[i % len(KINDS)] for i in range(n_columns)}
+
+
+def make_frame(fields, n, coerced=True, seed=0):
+    rnd = np.random.default_rng(seed)
+    data = {}
+    for name, kind in fields.items():
+        values = rnd.integers(0, 1000, size=n)
+        if kind == "int":
+            data[name] = values if coerced else values.astype(float)
+        elif kind == "float":
+            data[name] = values.astype(float)
+        elif kind == "str":
+            data[name] = pd.array(values.astype(str), dtype="str") if coerced else values.astype(str).astype(object)
+        elif kind == "datetime64[s]":
+            data[name] = values.astype("datetime64[s]") if coerced else values.astype("datetime64[ns]")
+        else:
+            data[name] = np.char.encode(values.astype(str)).astype(object)
+    return pd.DataFrame(data)
+
+
+def legacy_coerce(data, fields):
+    data = data.reindex(columns=fields.keys())
+    dtypes = {}
+    for k, v in fields.items():
+        if v == "bytes":
+            data[k] = data[k].str.decode("utf-8")
+            v = "str"
+        dtypes[k] = v
+    return data.astype(dtype=dtypes)
+
+
+def run(n=200000, n_columns=100, repeat=3):
+    fields = make_fields(n_columns)
+    plan = CoercionPlan(fields)
+    results = {}
+    for case, coerced in [("matching", True), ("converting", False)]:
+        df = make_frame(fields, n, coerced)
+        results[case] = {
+            "legacy": min(timeit.repeat(lambda: legacy_coerce(df, fields), number=1, repeat=repeat)),
+            "plan": min(timeit.repeat(lambda: plan.apply(df), number=1, repeat=repeat)),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for case, result in run().items():
+        for name, seconds in result.items():
+            print("{:>12} {:>8}: {:8.3f} s".format(case, name, seconds))
@@ -0,0 +1,66 @@
+import os
+import random
+import tempfile
+import timeit
+
+import yaml
+
+from pyd2m.config import Config
+
+
+def make_config(base, n_files, n_fields, fields_per_file=6, seed=0):
+    rnd = random.Random(seed)
+    data = {"raw": {}}
+    for i in range(n_files):
+        fields = rnd.sample(range(n_fields), fields_per_file)
+        data["raw"]["file_{}.csv".format(i)] = {"FIELDS": [{"F{}".format(f): "int"} for f in fields]}
+    conf = [{"DEFAULTS": {"TYPE": "csv", "DECLARE_NEW_FIELDS": True,
+                          "LOCAL_FIELDS_ONLY": False, "FREE_FIELDS": False}},
+            {"DATA": data}]
+    with open(os.path.join(base, "d2m.rc"), "w") as f:
+        yaml.dump(conf, f)
+    return Config(base)
+
+
+def linear_search_fields(config, *fields):
+    for data in config.DATA.values():
+        _fields = data.has_fields(*fields)
+        if _fields:
+            yield data.path, _fields
+
+
+def sample_queries(n_fields, n, size=3, seed=0):
+    rnd = random.Random(seed)
+    return [["F{}".format(f) for f in rnd.sample(range(n_fields), size)] for _ in range(n)]
+
+
+def run(n_files=1500, n_fields=300, n_queries=200, n_distinct=20, repeat=3):
+    with tempfile.TemporaryDirectory() as base:
+        config = make_config(base, n_files, n_fields)
+        queries = sample_queries(n_fields, n_distinct)
+        queries = [queries[i % n_distinct] for i in range(n_queries)]
+        for q in queries[:n_distinct]:
+            assert list(linear_search_fields(config, *q)) == list(config.search_fields(*q))
+
+        def linear():
+            for q in queries:
+                sorted(linear_search_fields(config, *q), key=lambda x: len(x[1]), reverse=True)
+
+        def indexed_cold():
+            for q in queries:
+                config.field_index._search(frozenset(q))
+
+        def indexed():
+            for q in queries:
+                config.cover_fields(*q)
+
+        results = {}
+        for name, func in [("linear", linear), ("index", indexed_cold), ("index+cache", indexed)]:
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            results[name] = best / n_queries * 1e6
+        return results
+
+
+if __name__ == "__main__":
+    for name, us in run().items():
+        print("{:>12}: {:10.2f} us/lookup".format(name, us))
@@ -0,0 +1,70 @@
+import os
+import random
+import tempfile
+import timeit
+
+import yaml
+
+from pyd2m.config import Config, cmp_path
+
+
+def make_config(base, n_templated, n_literal):
+    data = {"raw": {}}
+    for i in range(n_literal):
+        data["raw"]["file_{}.csv".format(i)] = {"FIELDS": [{"F{}".format(i): "int"}]}
+    for i in range(n_templated):
+        group = "plan_{exp}" if i % 2 else "{date}_run"
+        data.setdefault(group, {})["out_{}.msg".format(i)] = {"FIELDS": [{"G{}".format(i): "int"}]}
+    conf = [{"DEFAULTS": {"TYPE": "csv", "DECLARE_NEW_FIELDS": True,
+                          "LOCAL_FIELDS_ONLY": False, "FREE_FIELDS": False}},
+            {"DATA": data}]
+    with open(os.path.join(base, "d2m.rc"), "w") as f:
+        yaml.dump(conf, f)
+    return Config(base)
+
+
+def linear_search_ex(config, path):
+    for pattern in config.DATA:
+        matches = cmp_path(pattern, path)
+        if matches is not None:
+            return pattern, matches
+
+
+def sample_paths(config, n, seed=0):
+    rnd = random.Random(seed)
+    patterns = list(config.DATA)
+    paths = []
+    for _ in range(n):
+        pattern = rnd.choice(patterns)
+        paths.append(pattern.format(exp="exp_{}".format(rnd.randrange(50)), date="2019{:04d}".format(rnd.randrange(365))))
+    return paths
+
+
+def run(n_templated=400, n_literal=100, n_lookups=2000, repeat=3):
+    with tempfile.TemporaryDirectory() as base:
+        config = make_config(base, n_templated, n_literal)
+        paths = sample_paths(config, n_lookups)
+
+        def linear():
+            for p in paths:
+                linear_search_ex(config, p)
+
+        def indexed_cold():
+            config.index.cache.clear()
+            for p in paths:
+                config.index._match(p)
+
+        def indexed():
+            for p in paths:
+                config.search_ex(p)
+
+        results = {}
+        for name, func in [("linear", linear), ("index", indexed_cold), ("index+lru", indexed)]:
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            results[name] = best / n_lookups * 1e6
+        return results
+
+
+if __name__ == "__main__":
+    for name, us in run().items():
+        print("{:>10}: {:10.2f} us/lookup".format(name, us))
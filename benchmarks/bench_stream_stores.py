@@ -0,0 +1,87 @@
+import os
+import pickle
+import tempfile
+import time
+
+import msgpack
+import numpy as np
+import pandas as pd
+
+from pyd2m.store import DSMsgpackStream, PickleStream, msgpack_default
+
+
+def make_frame(n, seed=0):
+    rnd = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "BoxID": np.arange(n).astype(str),
+        "Position": rnd.integers(0, 3000, size=n),
+        "Weight": rnd.random(size=n) * 30,
+        "Time": pd.to_datetime("2019") + pd.to_timedelta(rnd.integers(0, 86400 * 30, size=n), unit="s"),
+    })
+
+
+def write_legacy_msgpack(path, df):
+    packer = msgpack.Packer(default=msgpack_default)
+    with open(path, "wb") as f:
+        f.write(packer.pack(df.columns.tolist()))
+        for row in df.itertuples(index=False, name=None):
+            f.write(packer.pack(row))
+
+
+def load_legacy_msgpack(path):
+    with open(path, "rb") as f:
+        unpacker = msgpack.Unpacker(f)
+        columns = unpacker.unpack()
+        data = []
+        for item in unpacker:
+            data.append(item)
+    return pd.DataFrame(data, columns=columns)
+
+
+def write_legacy_pickle(path, df):
+    with open(path, "wb") as f:
+        for row in df.itertuples(index=False, name=None):
+            pickle.dump(row, f)
+
+
+def load_legacy_pickle(path):
+    data = []
+    with open(path, "rb") as f:
+        try:
+            while True:
+                data.append(pickle.load(f))
+        except EOFError:
+            pass
+    return data
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def run(n=500000):
+    df = make_frame(n)
+    results = {}
+    with tempfile.TemporaryDirectory() as base:
+        cases = [
+            ("msgpack_stream", DSMsgpackStream(), write_legacy_msgpack, load_legacy_msgpack),
+            ("pickle_stream", PickleStream(), write_legacy_pickle, load_legacy_pickle),
+        ]
+        for name, store, write_legacy, load_legacy in cases:
+            legacy_path = os.path.join(base, name + ".legacy")
+            path = os.path.join(base, name + ".columnar")
+            results[name] = {
+                "legacy_write": n / timed(write_legacy, legacy_path, df),
+                "legacy_load": n / timed(load_legacy, legacy_path),
+                "columnar_write": n / timed(store.dump, path, df, None),
+                "columnar_load": n / timed(store.load, path, None),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    for name, result in run().items():
+        for case, rows_per_sec in result.items():
+            print("{:>15} {:>15}: {:12,.0f} rows/s".format(name, case, rows_per_sec))
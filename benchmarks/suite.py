@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from pyd2m import DataSource
+from pyd2m.catalog import CATALOG_FILE
+
+from . import bench_arrow_store, bench_coercion, bench_field_index, bench_path_index, bench_stream_stores
+from .synthetic import FRAME_STORES, make_dataset
+
+SCALES = {
+    "quick": dict(n_vessels=50, n_boxes=20000, n_templates=50, depth=5),
+    "default": dict(n_vessels=200, n_boxes=200000, n_templates=200, depth=10),
+    "large": dict(n_vessels=1000, n_boxes=2000000, n_templates=1500, depth=20),
+}
+
+MICRO = {
+    "quick": {
+        "path_index": (bench_path_index, dict(n_templated=100, n_literal=50, n_lookups=500)),
+        "field_index": (bench_field_index, dict(n_files=300, n_queries=100)),
+        "coercion": (bench_coercion, dict(n=20000, n_columns=20)),
+        "stream_stores": (bench_stream_stores, dict(n=20000)),
+        "arrow_store": (bench_arrow_store, dict(n=100000)),
+    },
+    "default": {
+        "path_index": (bench_path_index, {}),
+        "field_index": (bench_field_index, {}),
+        "coercion": (bench_coercion, {}),
+        "stream_stores": (bench_stream_stores, {}),
+        "arrow_store": (bench_arrow_store, {}),
+    },
+}
+
+
+def best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def open_ds(base, **kwargs):
+    return DataSource(base, silent=True, clear_tmp=False, exp="e1", **kwargs)
+
+
+def bench_stores(base, repeat):
+    ds = open_ds(base)
+    boxes = ds.load("raw/box_info.csv")
+    results = {}
+    for tag in FRAME_STORES:
+        path = "bench/boxes.{}".format(tag)
+        ds.dump(path, boxes)
+        results[tag] = {
+            "dump_s": best_of(lambda: ds.dump(path, boxes), repeat),
+            "load_s": best_of(lambda: ds.load(path), repeat),
+            "load_peak_bytes": peak_memory(lambda: ds.load(path)),
+            "file_bytes": os.path.getsize(ds.real_path(path)),
+        }
+    return results
+
+
+def bench_resolution(base, repeat, n_lookups=2000):
+    ds = open_ds(base)
+    patterns = [p for p in ds.all_files if "{" in p]
+    paths = [p.format(exp="e{}".format(i % 7), date="2019{:04d}".format(i)) for i, p in
+             zip(range(n_lookups), patterns * (n_lookups // max(len(patterns), 1) + 1))]
+
+    def expand():
+        for p in paths:
+            ds.expand_path(p, {})
+
+    def resolve():
+        for p in paths:
+            ds.real_path(p, check_existing=False)
+
+    def exists():
+        for p in paths:
+            ds.exists(p)
+
+    return {
+        "expand_path_us": best_of(expand, repeat) / len(paths) * 1e6,
+        "real_path_us": best_of(resolve, repeat) / len(paths) * 1e6,
+        "exists_us": best_of(exists, repeat) / len(paths) * 1e6,
+    }
+
+
+def bench_planning(base, repeat, depth):
+    ds = open_ds(base)
+    target = "plan_{{exp}}/stage_{}.parquet".format(depth - 1)
+    results = {
+        "depth": depth,
+        "plan_s": best_of(lambda: ds.plan(target), repeat),
+        "steps": len(ds.plan(target)),
+    }
+    start = time.perf_counter()
+    ds.build(target)
+    results["build_s"] = time.perf_counter() - start
+    results["plan_built_s"] = best_of(lambda: ds.plan(target), repeat)
+    results["plan_stale_s"] = best_of(lambda: ds.plan(target, rebuild="stale"), repeat)
+    return results
+
+
+def bench_joins(base, repeat):
+    ds = open_ds(base)
+    cached = open_ds(base, cache_joins=True)
+    fields = ["BoxID", "UnloadingVesselArrivalID", "Length", "MooringPosition"]
+    ds[fields]
+    cached[fields]
+    return {
+        "fields": fields,
+        "autogen_s": best_of(lambda: ds[fields], repeat),
+        "autogen_cached_s": best_of(lambda: cached[fields], repeat),
+        "explain_s": best_of(lambda: ds.explain(fields), repeat),
+        "autogen_peak_bytes": peak_memory(lambda: ds[fields]),
+    }
+
+
+def bench_construction(base, repeat):
+    catalog = os.path.join(base, CATALOG_FILE)
+
+    def cold():
+        if os.path.exists(catalog):
+            os.remove(catalog)
+        open_ds(base)
+
+    ds = open_ds(base)
+    state = pickle.dumps(ds)
+    return {
+        "cold_s": best_of(cold, repeat),
+        "warm_s": best_of(lambda: open_ds(base), repeat),
+        "unpickle_s": best_of(lambda: pickle.loads(state), repeat),
+        "pickle_bytes": len(state),
+        "construct_peak_bytes": peak_memory(lambda: open_ds(base)),
+    }
+
+
+def bench_micro(scale):
+    results = {}
+    for name, (module, kwargs) in MICRO["quick" if scale == "quick" else "default"].items():
+        results[name] = module.run(**kwargs)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale="quick", repeat=3, micro=True, base=None):
+    params = SCALES[scale]
+    with tempfile.TemporaryDirectory(dir=base) as base:
+        make_dataset(base, **params)
+        results = {
+            "construction": bench_construction(base, repeat),
+            "resolution": bench_resolution(base, repeat),
+            "planning": bench_planning(base, repeat, params["depth"]),
+            "joins": bench_joins(base, repeat),
+            "stores": bench_stores(base, repeat),
+        }
+    if micro:
+        results["micro"] = bench_micro(scale)
+    return {
+        "meta": {
+            "scale": scale,
+            "params": params,
+            "repeat": repeat,
+            "revision": git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = "{}.{}".format(prefix, key) if prefix else str(key)
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(old, new, threshold=0.1):
+    old = dict(flatten(old["results"]))
+    rows = []
+    for name, value in flatten(new["results"]):
+        if name in old and old[name]:
+            ratio = value / old[name]
+            flag = "" if abs(ratio - 1) <= threshold else ("+" if ratio > 1 else "-")
+            rows.append((name, old[name], value, ratio, flag))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the pyd2m benchmark suite")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-micro", action="store_true", help="skip the single-component benchmarks")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="compare with the results in this JSON file")
+    args = parser.parse_args(argv)
+
+    result = run(args.scale, args.repeat, micro=not args.no_micro)
+    text = json.dumps(result, indent=1, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for name, before, after, ratio, flag in compare(old, result):
+            print("{:<60} {:>14.6g} {:>14.6g} {:>7.2f}x {}".format(name, before, after, ratio, flag), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+
+FRAME_STORES = ["csv", "parquet", "feather", "arrow", "msgpack_stream", "pickle_stream", "pickle"]
+BOX_FIELDS = [{"BoxID": "str"}, {"UnloadingVesselArrivalID": "str"}, {"LoadingVesselArrivalID": "str"}]
+
+COOKBOOK = '''from pyd2m.cookbook import recipe
+import numpy as np
+import pandas as pd
+
+DEPTH = __DEPTH__
+
+
+@recipe("plan_{exp}/berthing.parquet")
+def gen_berthing_plan(cb):
+    df = cb.DS["VesselArrivalID", "Length", "ArrivalTime"]
+    rnd = np.random.default_rng(0)
+    df["MooringPosition"] = rnd.integers(0, cb.DS.QUAY_LENGTH, size=len(df))
+    df["MooringTime"] = df.ArrivalTime + pd.to_timedelta(rnd.random(size=len(df)) * cb.DS.MAX_WAITING_TIME, unit="s")
+    return df
+
+
+def make_stage(i):
+    source = "raw/box_info.csv" if i == 0 else "plan_{{exp}}/stage_{}.parquet".format(i - 1)
+
+    def stage(cb, df):
+        df = df[["BoxID"] + ([] if i == 0 else ["S{}".format(i - 1)])].copy()
+        df["S{}".format(i)] = i if i == 0 else df["S{}".format(i - 1)] + 1
+        return df[["BoxID", "S{}".format(i)]]
+
+    stage.__name__ = "stage_{}".format(i)
+    recipe(ingredients=[source], dishes=["plan_{{exp}}/stage_{}.parquet".format(i)])(stage)
+
+
+for i in range(DEPTH):
+    make_stage(i)
+'''
+
+
+def make_frames(n_vessels, n_boxes, seed=0):
+    rnd = np.random.default_rng(seed)
+    arrival = pd.to_datetime("2019") + pd.to_timedelta(np.sort(rnd.integers(0, 86400 * 365, size=n_vessels)), unit="s")
+    vessel_id = np.arange(n_vessels).astype(str)
+    vessels = pd.DataFrame({
+        "VesselID": vessel_id,
+        "Length": rnd.integers(100, 400, size=n_vessels),
+        "ArrivalTime": arrival.floor("s"),
+        "VesselArrivalID": arrival.strftime("%m%d") + "V" + vessel_id,
+    })
+    arrival_ids = vessels.VesselArrivalID.to_numpy()
+    boxes = pd.DataFrame({
+        "BoxID": np.arange(n_boxes).astype(str),
+        "UnloadingVesselArrivalID": arrival_ids[rnd.integers(0, n_vessels, size=n_boxes)],
+        "LoadingVesselArrivalID": arrival_ids[rnd.integers(0, n_vessels, size=n_boxes)],
+    })
+    return vessels, boxes
+
+
+def make_config(n_templates, depth):
+    data = {
+        "raw": {
+            "vessel_info.csv": {"FIELDS": [{"VesselID": "str"}, {"Length": "int"},
+                                           {"ArrivalTime": "datetime64[s]"}, {"VesselArrivalID": "str"}]},
+            "box_info.csv": {"FIELDS": BOX_FIELDS},
+        },
+        "plan_{exp}": {
+            "berthing.parquet": {"TYPE": "parquet", "FIELDS": [{"VesselArrivalID": "str"}, {"MooringPosition": "int"},
+                                                               {"MooringTime": "datetime64[s]"}]},
+        },
+        "bench": {"boxes.{}".format(tag): {"TYPE": tag, "FIELDS": BOX_FIELDS} for tag in FRAME_STORES},
+    }
+    for i in range(depth):
+        data["plan_{exp}"]["stage_{}.parquet".format(i)] = {"TYPE": "parquet",
+                                                           "FIELDS": [{"BoxID": "str"}, {"S{}".format(i): "int"}]}
+    for i in range(max(n_templates - depth, 0)):
+        group = "run_{date}" if i % 2 else "plan_{exp}"
+        data.setdefault(group, {})["extra_{}.parquet".format(i)] = {
+            "TYPE": "parquet", "FIELDS": [{"BoxID": "str"}, {"X{}".format(i): "float"}]}
+    return [
+        {"DEFAULTS": {"TYPE": "csv", "DECLARE_NEW_FIELDS": True, "LOCAL_FIELDS_ONLY": False, "FREE_FIELDS": False}},
+        {"PARAMS": {"QUAY_LENGTH": 3000, "MAX_WAITING_TIME": 7200}},
+        {"DATA": data},
+    ]
+
+
+def make_dataset(base, n_vessels=200, n_boxes=100000, n_templates=50, depth=5, seed=0):
+    conf = os.path.join(base, "conf")
+    os.makedirs(conf, exist_ok=True)
+    os.makedirs(os.path.join(base, "raw"), exist_ok=True)
+    with open(os.path.join(conf, "d2m.rc"), "w") as f:
+        yaml.dump(make_config(n_templates, depth), f, sort_keys=False)
+    with open(os.path.join(conf, "port.cb"), "w") as f:
+        f.write(COOKBOOK.replace("__DEPTH__", str(depth)))
+    vessels, boxes = make_frames(n_vessels, n_boxes, seed)
+    vessels.to_csv(os.path.join(base, "raw", "vessel_info.csv"), index=False)
+    boxes.to_csv(os.path.join(base, "raw", "box_info.csv"), index=False)
+    return base
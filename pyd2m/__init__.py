@@ -1 +1,2 @@
-from .datasource import DataSource
\ No newline at end of file
+from .datasource import DataSource
+from .aio import AsyncDataSource
@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .cache import cow_copy
+from .datasource import DataSource
+from .planner import UNBUILDABLE
+
+
+class AsyncDataSource:
+    def __init__(self, data_path, *args, max_workers=None, **kwargs):
+        self.ds = data_path if isinstance(data_path, DataSource) else DataSource(data_path, *args, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers or self.ds.io_workers)
+        self.inflight = {}
+        self.requests = 0
+        self.deduplicated = 0
+
+    def __getattr__(self, item):
+        return getattr(self.ds, item)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def _key(self, op, path, vars, *extra):
+        vars = dict(vars)
+        path = self.ds.expand_path(path, vars)
+        return (op, self.ds._format_path(path, vars)) + extra
+
+    async def _shared(self, key, factory):
+        self.requests += 1
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self.inflight[key] = future
+            future.add_done_callback(lambda f: self.inflight.pop(key) if self.inflight.get(key) is f else None)
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, path, vars):
+        target = self._key(None, path, vars)[1]
+        for key in [k for k in self.inflight if k[1] == target]:
+            del self.inflight[key]
+
+    async def aload(self, path, generate=True, columns=None, where=None, concat=False, **vars):
+        key = self._key("load", path, vars, generate, None if columns is None else tuple(columns), repr(where),
+                        concat)
+
+        async def load():
+            if generate and not await self.run(self.ds.exists, path, **vars):
+                await self.agenerate(path, load=False, **vars)
+            return await self.run(self.ds.load, path, generate=generate, columns=columns, where=where,
+                                  concat=concat, **vars)
+
+        return cow_copy(await self._shared(key, load))
+
+    async def adump(self, path, data, append=False, **vars):
+        self._forget(path, vars)
+        result = await self.run(self.ds.dump, path, data, append=append, **vars)
+        self._forget(path, vars)
+        return result
+
+    async def aautogen(self, path_or_fields, how="inner", skip_path=None, where=None):
+        fields = (path_or_fields,) if isinstance(path_or_fields, str) else tuple(path_or_fields)
+        key = ("autogen", fields, how, None if skip_path is None else tuple(skip_path), repr(where))
+        data, unknown = await self._shared(key, partial(self.run, self.ds.autogen, path_or_fields, how=how,
+                                                        skip_path=skip_path, where=where))
+        return cow_copy(data), unknown
+
+    async def agenerate(self, path, rebuild="missing", load=True, **vars):
+        key = self._key("generate", path, vars, rebuild)
+        await self._shared(key, partial(self.abuild, path, rebuild=rebuild, **vars))
+        if load:
+            return await self.aload(path, generate=False, **vars)
+
+    async def abuild(self, path, rebuild="missing", **vars):
+        plan = await self.run(self.ds.plan, path, rebuild=rebuild, **vars)
+        if plan.state == UNBUILDABLE:
+            raise SystemError("Cannot find any recipe for {}".format(plan.target))
+        tasks = {}
+
+        def schedule(step):
+            if step not in tasks:
+                tasks[step] = asyncio.ensure_future(self._cook(step, [schedule(d) for d in step.deps]))
+            return tasks[step]
+
+        for step in plan:
+            schedule(step)
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            if self.ds.catalog.dirty:
+                await self.run(self.ds.save_catalog)
+
+    async def _cook(self, step, deps):
+        await asyncio.gather(*deps)
+        recipe, vars = step.recipe, step.vars
+        if step.recheck and not await self.run(lambda: any(self.ds.is_stale(d, **vars) for d in recipe.dishes)):
+            return
+        if recipe.stream:
+            await self.run(self.ds.generate_by_recipe, recipe, check_existing=False, **vars)
+            return
+        ingredients = await asyncio.gather(*(self.aload(i, **vars) for i in recipe.ingredients))
+        await self.run(self.ds.generate_by_recipe, recipe, check_existing=False, ingredients=ingredients, **vars)
+        for dish in recipe.dishes:
+            self._forget(dish, vars)
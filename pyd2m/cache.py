@@ -0,0 +1,202 @@
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+import weakref
+from collections import OrderedDict
+from threading import RLock
+
+import numpy as np
+import pandas as pd
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(size):
+    if size is None or isinstance(size, bool):
+        return None
+    if isinstance(size, (int, float)):
+        return int(size)
+    matches = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)i?B?\s*", size.upper())
+    if not matches:
+        raise ValueError("Invalid size: {}".format(size))
+    return int(float(matches.group(1)) * SIZE_UNITS[matches.group(2)])
+
+
+def sizeof(data):
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(index=True, deep=True).sum())
+    elif isinstance(data, pd.Series):
+        return int(data.memory_usage(index=True, deep=True))
+    elif isinstance(data, np.ndarray):
+        return data.nbytes
+    elif isinstance(data, (list, tuple)):
+        return sys.getsizeof(data) + sum(sizeof(item) for item in data)
+    elif isinstance(data, dict):
+        return sys.getsizeof(data) + sum(sizeof(k) + sizeof(v) for k, v in data.items())
+    else:
+        return sys.getsizeof(data)
+
+
+def copy_on_write():
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def cow_copy(data):
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.copy(deep=not copy_on_write())
+    return data
+
+
+class MemoryCache:
+    def __init__(self, budget=None):
+        self.budget = parse_size(budget)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = RLock()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, data):
+        size = sizeof(data)
+        with self.lock:
+            self.invalidate(key)
+            if self.budget is not None and size > self.budget:
+                return False
+            self.entries[key] = data, size
+            self.size += size
+            while self.budget is not None and self.size > self.budget:
+                self.evict()
+            return True
+
+    def evict(self):
+        key, (data, size) = self.entries.popitem(last=False)
+        self.size -= size
+        self.evictions += 1
+        return key, data
+
+    def invalidate(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class JoinCache(MemoryCache):
+    def __init__(self, budget=None, spill_dir=None):
+        super().__init__(budget)
+        self.spill_root = spill_dir
+        self.spill_dir = None
+        self.spilled = {}
+        self.paths = {}
+        self.spills = 0
+
+    def _spill_path(self, key):
+        if self.spill_dir is None:
+            os.makedirs(self.spill_root, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(dir=self.spill_root)
+            weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".pkl")
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            spill_path = self.spilled.pop(key, None)
+            if spill_path is None:
+                self.misses += 1
+                return default
+            with open(spill_path, "rb") as f:
+                data = pickle.load(f)
+            os.remove(spill_path)
+            self.hits += 1
+            self.put(key, data, self.paths.get(key, ()))
+            return data
+
+    def put(self, key, data, paths=()):
+        with self.lock:
+            self.paths[key] = tuple(paths)
+            if super().put(key, data):
+                return True
+            if self.spill_root is not None and isinstance(data, pd.DataFrame):
+                self.spill(key, data)
+                return True
+            return False
+
+    def spill(self, key, data):
+        spill_path = self._spill_path(key)
+        with open(spill_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled[key] = spill_path
+        self.spills += 1
+
+    def evict(self):
+        key, data = super().evict()
+        if self.spill_root is not None and isinstance(data, pd.DataFrame):
+            self.spill(key, data)
+        else:
+            self.paths.pop(key, None)
+        return key, data
+
+    def invalidate(self, key):
+        with self.lock:
+            super().invalidate(key)
+            spill_path = self.spilled.pop(key, None)
+            if spill_path is not None and os.path.exists(spill_path):
+                os.remove(spill_path)
+
+    def invalidate_path(self, real_path):
+        with self.lock:
+            for key in [k for k, paths in self.paths.items() if real_path in paths]:
+                self.invalidate(key)
+                del self.paths[key]
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.spilled):
+                self.invalidate(key)
+            super().clear()
+            self.paths.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats["spilled"] = len(self.spilled)
+        stats["spills"] = self.spills
+        return stats
@@ -0,0 +1,99 @@
+import marshal
+import os
+import pickle
+import uuid
+from threading import Lock
+
+CATALOG_FILE = os.path.join(".d2m", "catalog.pickle")
+CATALOG_VERSION = 3
+SOURCE_SUFFIXES = (".cb", ".hk")
+
+
+def config_sources(conf_bases):
+    sources = []
+    for base in sorted(conf_bases):
+        try:
+            with os.scandir(base) as it:
+                for entry in it:
+                    if entry.is_file() and (entry.name == "d2m.rc" or entry.name.endswith(SOURCE_SUFFIXES)):
+                        stat = entry.stat()
+                        sources.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            sources.append((base, None, None))
+    return sorted(sources)
+
+
+def compile_source(path):
+    with open(path, "r") as f:
+        return compile(f.read(), path, "exec")
+
+
+class Catalog:
+    def __init__(self, base):
+        self.base = base
+        self.path = os.path.join(base, CATALOG_FILE)
+        self.config = None
+        self.sources = []
+        self.code = {}
+        self.stats = {}
+        self.dirty = False
+        self.lock = Lock()
+
+    def open(self, config_base, read_config):
+        state = self.read()
+        if state is not None and config_base in state["config"].conf_base and \
+                config_sources(state["config"].conf_base) == state["sources"]:
+            self.config = state["config"]
+            self.sources = state["sources"]
+            self.code = state["code"]
+            self.stats = state["stats"]
+        else:
+            self.config = read_config(config_base)
+            self.sources = config_sources(self.config.conf_base)
+            self.code = {}
+            self.stats = {}
+            self.dirty = True
+        return self.config
+
+    def compiled(self, path):
+        if path not in self.code:
+            self.code[path] = marshal.dumps(compile_source(path))
+            self.dirty = True
+        return marshal.loads(self.code[path])
+
+    def read(self):
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError, IndexError):
+            return None
+        if not isinstance(state, dict) or state.get("version") != CATALOG_VERSION:
+            return None
+        return state
+
+    def save(self, stats=None):
+        with self.lock:
+            if stats is not None:
+                self.stats = stats
+            state = {
+                "version": CATALOG_VERSION,
+                "config": self.config,
+                "sources": self.sources,
+                "code": self.code,
+                "stats": dict(self.stats),
+            }
+            tmp_path = "{}.{}.tmp".format(self.path, uuid.uuid4().hex)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except (OSError, pickle.PicklingError, TypeError):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def clear(self):
+        with self.lock:
+            self.stats = {}
+            self.dirty = True
@@ -0,0 +1,121 @@
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.compute
+except ImportError:
+    pyarrow = None
+
+STR_DTYPES = ("str", "string", "category", "auto")
+CATEGORY_RATIO = 0.5
+
+
+def decode_bytes(series):
+    if isinstance(series.dtype, pd.StringDtype):
+        return series
+    if pyarrow is not None:
+        try:
+            array = pyarrow.array(series.to_numpy(dtype=object), type=pyarrow.binary(), from_pandas=True)
+            array = pyarrow.compute.cast(array, pyarrow.string())
+            return pd.Series(array.to_pandas(), index=series.index, name=series.name)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError):
+            pass
+    return series.str.decode("utf-8")
+
+
+def string_dtype():
+    return pd.StringDtype("pyarrow") if pyarrow is not None else pd.StringDtype()
+
+
+def is_low_cardinality(series):
+    return len(series) > 0 and series.nunique(dropna=True) <= len(series) * CATEGORY_RATIO
+
+
+class Conversion:
+    def __init__(self, name, dtype, decode=False, str_dtype="str"):
+        self.name = name
+        self.dtype = pd.api.types.pandas_dtype(dtype) if dtype is not None else None
+        self.decode = decode
+        self.str_dtype = str_dtype if self.dtype == pd.api.types.pandas_dtype("str") else "str"
+
+    def matches(self, series, dtype):
+        if isinstance(series.dtype, pd.ArrowDtype):
+            if isinstance(dtype, pd.StringDtype):
+                return pyarrow.types.is_string(series.dtype.pyarrow_dtype) \
+                    or pyarrow.types.is_large_string(series.dtype.pyarrow_dtype)
+            return series.dtype.numpy_dtype == dtype
+        return series.dtype == dtype and series.dtype != object
+
+    def __call__(self, series):
+        if self.decode:
+            series = decode_bytes(series)
+        if self.dtype is None:
+            return series
+        dtype = self.dtype
+        if self.str_dtype == "string":
+            dtype = string_dtype()
+        elif self.str_dtype == "category" or (self.str_dtype == "auto" and is_low_cardinality(series)):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                return series
+            if not self.matches(series, self.dtype):
+                series = series.astype(self.dtype)
+            return series.astype("category")
+        if self.matches(series, dtype):
+            return series
+        return series.astype(dtype)
+
+
+class CoercionPlan:
+    def __init__(self, fields, str_dtype="str", decode=True):
+        if str_dtype not in STR_DTYPES:
+            raise ValueError("Unknown STR_DTYPE \"{}\", expected one of {}".format(str_dtype, STR_DTYPES))
+        self.names = list(fields)
+        self.conversions = {}
+        for name, kind in fields.items():
+            if kind == "obj":
+                continue
+            elif kind == "bytes":
+                if decode:
+                    self.conversions[name] = Conversion(name, "str", decode=True, str_dtype=str_dtype)
+            else:
+                self.conversions[name] = Conversion(name, kind, str_dtype=str_dtype)
+        self.subsets = {}
+
+    def select(self, columns):
+        if columns is None:
+            return self.names
+        key = tuple(columns)
+        if key not in self.subsets:
+            columns = set(columns)
+            self.subsets[key] = [n for n in self.names if n in columns]
+        return self.subsets[key]
+
+    def apply(self, data, columns=None, inplace=False):
+        names = self.select(columns)
+        if list(data.columns) != names:
+            data = data.reindex(columns=names)
+            inplace = True
+        for name in names:
+            conversion = self.conversions.get(name)
+            if conversion is None:
+                continue
+            series = data[name]
+            converted = conversion(series)
+            if converted is not series:
+                if not inplace:
+                    data = data.copy(deep=False)
+                    inplace = True
+                data[name] = converted
+        return data
+
+
+def load_plan(data_conf):
+    if data_conf._load_plan is None:
+        data_conf._load_plan = CoercionPlan(data_conf.fields, getattr(data_conf, "STR_DTYPE", "str"))
+    return data_conf._load_plan
+
+
+def dump_plan(data_conf):
+    if data_conf._dump_plan is None:
+        data_conf._dump_plan = CoercionPlan(data_conf.fields, decode=False)
+    return data_conf._dump_plan
@@ -2,6 +2,8 @@ import importlib
 import inspect
 import os
 from collections import OrderedDict
+from heapq import merge
+from threading import Lock
 
 from copy import deepcopy
 import re
@@ -30,6 +32,126 @@ def cmp_path(pattern, path):
         return None
 
 
+class PathPattern:
+    PLACEHOLDER = r"([\w+\d\-_]+?)"
+
+    def __init__(self, pattern, order=0):
+        self.pattern = pattern
+        self.order = order
+        self.fields = []
+        self.prefix = None
+        regex = []
+        literal_size = 0
+        for literal, name, _, _ in Formatter().parse(pattern):
+            regex.append(re.escape(literal))
+            literal_size += len(literal)
+            if name is not None:
+                if self.prefix is None:
+                    self.prefix = pattern[:literal_size]
+                self.fields.append(name)
+                regex.append(self.PLACEHOLDER)
+        if self.prefix is None:
+            self.prefix = pattern
+        self.regex = re.compile("".join(regex))
+        self.sort_key = (-literal_size, len(self.fields), order)
+
+    @property
+    def is_literal(self):
+        return not self.fields
+
+    @property
+    def bucket(self):
+        head, sep, _ = self.prefix.partition("/")
+        if sep:
+            return "head", head
+        tail = self.pattern.rpartition("/")[2]
+        if "{" not in tail:
+            return "tail", tail
+        return None
+
+    def match(self, path):
+        if not path.startswith(self.prefix):
+            return None
+        matches = self.regex.fullmatch(path)
+        if matches:
+            return {k: v for k, v in zip(self.fields, matches.groups())}
+        return None
+
+    def __lt__(self, other):
+        return self.sort_key < other.sort_key
+
+
+class PathIndex:
+    def __init__(self, cache_size=4096):
+        self.patterns = {}
+        self.literals = {}
+        self.buckets = {}
+        self.wild = []
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        state["cache"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+    def add(self, pattern):
+        self.cache.clear()
+        if pattern in self.patterns:
+            return
+        p = PathPattern(pattern, order=len(self.patterns))
+        self.patterns[pattern] = p
+        if p.is_literal:
+            self.literals[pattern] = p
+            return
+        key = p.bucket
+        bucket = self.wild if key is None else self.buckets.setdefault(key, [])
+        bucket.append(p)
+        bucket.sort()
+
+    def extract(self, pattern, path):
+        p = self.patterns.get(pattern) or PathPattern(pattern)
+        return p.match(path) or {}
+
+    def _candidates(self, path):
+        head, sep, _ = path.partition("/")
+        heads = self.buckets.get(("head", head), []) if sep else []
+        tails = self.buckets.get(("tail", path.rpartition("/")[2]), [])
+        return merge(heads, tails, self.wild)
+
+    def _match(self, path):
+        if path in self.literals:
+            return path, {}
+        for p in self._candidates(path):
+            matches = p.match(path)
+            if matches is not None:
+                return p.pattern, matches
+        return None
+
+    def match(self, path):
+        with self.lock:
+            if path in self.cache:
+                self.cache.move_to_end(path)
+                result = self.cache[path]
+            else:
+                result = self._match(path)
+                self.cache[path] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        if result is None:
+            return None
+        return result[0], dict(result[1])
+
+
 def deep_update(d1, d2):
     if not isinstance(d1, dict):
         return d2
@@ -38,10 +160,73 @@ def deep_update(d1, d2):
     return d1
 
 
+class FieldIndex:
+    def __init__(self, cache_size=1024):
+        self.paths = {}
+        self.fields = {}
+        self.order = {}
+        self.cache_size = cache_size
+        self.covers = OrderedDict()
+        self.lock = Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        state["covers"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+    def add(self, data):
+        with self.lock:
+            self.covers.clear()
+            for field in self.fields.pop(data.path, ()):
+                self.paths[field].discard(data.path)
+            self.order.setdefault(data.path, len(self.order))
+            if not data.searchable():
+                return
+            self.fields[data.path] = set(data.fields)
+            for field in data.fields:
+                self.paths.setdefault(field, set()).add(data.path)
+
+    def _search(self, fields):
+        candidates = set()
+        for field in fields:
+            candidates |= self.paths.get(field, set())
+        found = []
+        for path in sorted(candidates, key=self.order.get):
+            found.append((path, frozenset(f for f in fields if f in self.fields[path])))
+        covers = sorted(found, key=lambda x: len(x[1]), reverse=True)
+        return found, covers
+
+    def lookup(self, fields):
+        key = frozenset(fields)
+        with self.lock:
+            if key in self.covers:
+                self.covers.move_to_end(key)
+                return self.covers[key]
+        result = self._search(key)
+        with self.lock:
+            self.covers[key] = result
+            if len(self.covers) > self.cache_size:
+                self.covers.popitem(last=False)
+        return result
+
+    def search(self, fields):
+        return [(path, set(fs)) for path, fs in self.lookup(fields)[0]]
+
+    def cover(self, fields):
+        return [(path, set(fs)) for path, fs in self.lookup(fields)[1]]
+
+
 class DataConfig:
     def __init__(self, path, config, defaults={}, declared_fields={}):
         self.path = path
         self._config = deep_update(deepcopy(defaults), config)
+        self._load_plan = None
+        self._dump_plan = None
         self.fields = OrderedDict()
         for field in self._config["FIELDS"]:
             if isinstance(field, dict):
@@ -53,8 +238,11 @@ class DataConfig:
                 if field not in declared_fields:
                     print("Warning: undeclared field type \"{}\" in {}".format(field, path))
 
+    def searchable(self):
+        return not (self._config["LOCAL_FIELDS_ONLY"] or self.path.startswith("tmp"))
+
     def has_fields(self, *fields):
-        if self._config["LOCAL_FIELDS_ONLY"] or self.path.startswith("tmp"):
+        if not self.searchable():
             return []
         else:
             return set(f for f in fields if f in self.fields)
@@ -66,6 +254,8 @@ class DataConfig:
             return self.fields
 
     def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
         item = item.upper()
         if item in self._config:
             return self._config[item]
@@ -87,6 +277,9 @@ class Config:
         self.FIELDS = dict()
         self.PARAMS = dict()
         self.DATA = dict()
+        self.index = PathIndex()
+        self.field_index = FieldIndex()
+        self._all_fields = None
         self.conf_base = set()
         self.read_config(conf_base)
 
@@ -114,30 +307,38 @@ class Config:
             for path, data_conf in _traverse_data(config):
                 data = DataConfig(path, data_conf, defaults=self.DEFAULTS, declared_fields=self.FIELDS)
                 self.DATA[path] = data
+                self.index.add(path)
+                self.field_index.add(data)
+                self._all_fields = None
                 self.FIELDS = deep_update(self.FIELDS, data.fields)
 
-    def cookbooks(self):
+    @staticmethod
+    def exec_source(entry, catalog=None):
+        loader = importlib.machinery.SourceFileLoader(entry.name[:-3], entry.path)
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        module = importlib.util.module_from_spec(spec)
+        if catalog is None:
+            spec.loader.exec_module(module)
+        else:
+            exec(catalog.compiled(entry.path), module.__dict__)
+        return module
+
+    def cookbooks(self, catalog=None):
         for base in self.conf_base:
             with os.scandir(base) as it:
                 for entry in it:
                     if entry.name.endswith('.cb') and entry.is_file():
-                        loader = importlib.machinery.SourceFileLoader(entry.name[:-3], entry.path)
-                        spec = importlib.util.spec_from_loader(loader.name, loader)
-                        cb = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(cb)
+                        cb = self.exec_source(entry, catalog)
                         for _, item in inspect.getmembers(cb, inspect.isclass):
                             if issubclass(item, CookBook) and item is not CookBook:
                                 yield item(ds=self)
 
-    def hooks(self):
+    def hooks(self, catalog=None):
         for base in self.conf_base:
             with os.scandir(base) as it:
                 for entry in it:
                     if entry.name.endswith('.hk') and entry.is_file():
-                        loader = importlib.machinery.SourceFileLoader(entry.name[:-3], entry.path)
-                        spec = importlib.util.spec_from_loader(loader.name, loader)
-                        hk = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(hk)
+                        hk = self.exec_source(entry, catalog)
                         if isinstance(hk.hooks, Hooks) and hk.hooks not in self.hooks:
                             yield hk.hooks
 
@@ -151,16 +352,13 @@ class Config:
         return path in self.DATA
 
     def search_fields(self, *fields):
-        for data in self.DATA.values():
-            _fields = data.has_fields(*fields)
-            if _fields:
-                yield data.path, _fields
+        yield from self.field_index.search(fields)
+
+    def cover_fields(self, *fields):
+        return self.field_index.cover(fields)
 
     def search_ex(self, path):
-        for pattern, data in self.DATA.items():
-            matches = cmp_path(pattern, path)
-            if matches is not None:
-                return pattern, matches
+        return self.index.match(path)
 
     @property
     def all_files(self):
@@ -168,8 +366,10 @@ class Config:
 
     @property
     def all_fields(self):
-        s = dict()
-        for value in self.DATA.values():
-            s.update(value.fields)
-        return s
+        if self._all_fields is None:
+            s = dict()
+            for value in self.DATA.values():
+                s.update(value.fields)
+            self._all_fields = s
+        return dict(self._all_fields)
 
@@ -1,22 +1,51 @@
+import hashlib
 import inspect
+import numpy as np
 import pandas as pd
 
 
 class MultiData:
-    def __init__(self, data=[]):
-        self.data = data
+    def __init__(self, data=None):
+        self.data = [] if data is None else data
+        self.frame = None
+
+    @classmethod
+    def groupby(cls, frame, field, drop_index=False):
+        md = cls()
+        md.frame = frame
+        md.field = field
+        md.drop_index = drop_index
+        return md
 
     def add(self, df, **kwargs):
         self.data.append((df, kwargs))
 
+    def flat(self):
+        return self.frame.reset_index(drop=self.drop_index)
+
+    def split(self, flat=None):
+        flat = self.flat() if flat is None else flat
+        codes, keys = pd.factorize(self.frame[self.field], sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+        flat = flat.take(order)
+        for i, key in enumerate(keys):
+            yield flat.iloc[bounds[i]:bounds[i + 1]].reset_index(drop=True), {self.field: key}
+
     def __iter__(self):
         yield from self.data
+        if self.frame is not None:
+            yield from self.split()
 
 
 class Recipe:
-    def __init__(self, ingredients=[], dishes=[]):
+    DEFAULT_CHUNKSIZE = 100000
+
+    def __init__(self, ingredients=[], dishes=[], stream=False, chunksize=None):
         self.ingredients = ingredients
         self.dishes = dishes
+        self.stream = stream
+        self.chunksize = chunksize or self.DEFAULT_CHUNKSIZE
         self.procedure = None
         self.name = None
         self.cookbook = None
@@ -25,12 +54,29 @@ class Recipe:
         self.procedure = func
         return self
 
-    def cook(self, ingredients, **condiments):
-        condiments = {k: v for k, v in condiments.items() if k in inspect.signature(self.procedure).parameters.keys()}
+    def accepts(self, condiments):
+        params = inspect.signature(self.procedure).parameters.keys()
+        return {k: v for k, v in condiments.items() if k in params}
+
+    @property
+    def source_hash(self):
+        try:
+            source = inspect.getsource(self.procedure)
+        except (OSError, TypeError):
+            code = self.procedure.__code__
+            source = repr((code.co_code, code.co_consts, code.co_names))
+        source = repr((source, self.ingredients, self.dishes))
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def serve(self, ingredients, **condiments):
+        condiments = self.accepts(condiments)
         dishes = self.procedure(self.cookbook, *ingredients, **condiments)
         if not isinstance(dishes, tuple) or len(dishes) != len(self.dishes):
             dishes = dishes,
-        for dish, path in zip(dishes, self.dishes):
+        return zip(self.dishes, dishes)
+
+    def cook(self, ingredients, **condiments):
+        for path, dish in self.serve(ingredients, **condiments):
             if isinstance(dish, MultiData):
                 for sd, svars in dish:
                     yield path, sd, svars
@@ -63,13 +109,13 @@ class CookBook:
                 print("\t{} => {}: {}".format(recipe.ingredients, recipe.dishes, recipe.name))
             print()
 
-    def recipe(self, single_dishes=None, ingredients=[], dishes=[]):
+    def recipe(self, single_dishes=None, ingredients=[], dishes=[], stream=False, chunksize=None):
 
         if single_dishes:
             dishes = [single_dishes]
 
         def wrapper(func):
-            self.register(Recipe(ingredients, dishes)(func))
+            self.register(Recipe(ingredients, dishes, stream=stream, chunksize=chunksize)(func))
             return func
 
         return wrapper
@@ -84,7 +130,7 @@ class CookBook:
             proc = lambda cb, left, right: left.merge(right, **kwargs)
         elif name == "groupby":
             field = kwargs.get("field")
-            proc = lambda cb, data: MultiData([(g.reset_index(), {field: k}) for k, g in data.groupby(field)])
+            proc = lambda cb, data: MultiData.groupby(data, field)
         else:
             raise NotImplementedError
         self.register(Recipe(ingredients=ingredients, dishes=dishes)(proc))
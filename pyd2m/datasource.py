@@ -5,13 +5,40 @@ from string import Formatter
 import inspect
 from glob import glob
 import re
+from urllib.parse import quote
 from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterator
 import pandas as pd
 
 from .config import Config
-from .cookbook import cookbook
+from .planner import Planner, EXISTS, UNBUILDABLE
+from .executor import PlanExecutor, load_many, bounded_map
+from .manifest import Manifests
+from .cache import MemoryCache, JoinCache, parse_size, cow_copy
+from .catalog import Catalog
+from .joinplan import JoinPlanner, TableStats
+from .cookbook import cookbook, MultiData
 from .hooks import hooks
 from . import store
+from . import predicates
+from . import coercion
+from .tracing import Tracer, TraceRecorder, file_size, measure
+from .locks import locked
+from .lazy import LazyFrame, LazySource
+from .storage import Storage, is_url
+
+try:
+    from . import shm
+except ImportError:
+    shm = None
+
+
+JOIN_SPILL_DIR = os.path.join(".d2m", "spill")
+
+recipe_vars = ContextVar("recipe_vars", default={})
+load_trace = ContextVar("load_trace", default=None)
 
 
 class GlobTrans:
@@ -26,26 +53,49 @@ class PartialStringFormatter(dict):
 
 class DataSource:
     def __init__(self, data_path, config_path=None,
-                 clear_cache=False, clear_tmp=True, cache_in_memory=False, silent=False, **vars):
-        self.base = os.path.realpath(os.path.expanduser(data_path))
+                 clear_cache=False, clear_tmp=True, cache_in_memory=False, silent=False,
+                 workers=1, executor="thread", io_workers=8, cache_joins=False, locking=True, lock_timeout=None,
+                 cache_dir=None, **vars):
+        self.storage = Storage(data_path, cache_dir) if is_url(data_path) else None
+        self.cache_dir = cache_dir
+        if self.storage is not None:
+            self.base = self.storage.local_root
+            if config_path is None:
+                self.storage.fetch(os.path.join(self.base, "conf"))
+        else:
+            self.base = os.path.realpath(os.path.expanduser(data_path))
         self.config_base = config_path or os.path.join(self.base, "conf")
         self.cache_in_memory = cache_in_memory
-        self.mem_cache = {}
+        self.mem_cache = MemoryCache(cache_in_memory)
+        self.cache_joins = cache_joins
+        self.join_cache = JoinCache(cache_joins, spill_dir=os.path.join(self.base, JOIN_SPILL_DIR)
+                                    if parse_size(cache_joins) is not None else None)
+        self.table_stats = TableStats()
+        self.tracer = Tracer()
         self.silent = silent
+        self.workers = workers
+        self.executor = executor
+        self.io_workers = io_workers
+        self.locking = locking
+        self.lock_timeout = lock_timeout
+        self.manifests = Manifests(self.base)
 
         self.vars = deepcopy(vars)
         self.cookbooks = [cookbook]
         cookbook.DS = self
         self.hooks = [hooks]
 
-        self.config = Config(self.config_base)
-        self.cookbooks.extend(self.config.cookbooks())
-        self.hooks.extend(self.config.hooks())
+        self.catalog = Catalog(self.base)
+        self.config = self.catalog.open(self.config_base, Config)
+        self.table_stats.entries.update(self.catalog.stats)
+        self.cookbooks.extend(self.config.cookbooks(self.catalog))
+        self.hooks.extend(self.config.hooks(self.catalog))
 
         self.stores = {}
-        for name, cls in inspect.getmembers(store, inspect.isclass):
-            if issubclass(cls, store.DataStore) and cls.TYPE_TAG is not None:
-                self.stores[cls.TYPE_TAG] = cls()
+        for module in filter(None, (store, shm)):
+            for name, cls in inspect.getmembers(module, inspect.isclass):
+                if issubclass(cls, store.DataStore) and cls.TYPE_TAG is not None:
+                    self.stores[cls.TYPE_TAG] = cls()
 
         # with os.scandir(self.config_base) as it:
         #     for entry in it:
@@ -73,9 +123,16 @@ class DataSource:
             tmp_path = None
         if tmp_path is not None and os.path.exists(tmp_path):
             shutil.rmtree(tmp_path)
+        if tmp_path is not None and self.storage is not None:
+            self.storage.remove(tmp_path)
 
         if clear_cache and os.path.exists(os.path.join(self.base, "cache")):
             shutil.rmtree(os.path.join(self.base, "cache"))
+        if clear_cache and self.storage is not None:
+            self.storage.remove(os.path.join(self.base, "cache"))
+
+        if self.catalog.dirty:
+            self.save_catalog()
 
     def expand_path(self, path, vars=None):
         vars = {} if vars is None else vars
@@ -86,29 +143,57 @@ class DataSource:
         else:
             return path
 
+    def save_catalog(self):
+        self.catalog.save(stats=dict(self.table_stats.entries))
+
     def __getstate__(self):
-        return self.base, self.config_base, self.vars, self.cache_in_memory
+        if self.catalog.dirty:
+            self.save_catalog()
+        base = self.base if self.storage is None else self.storage.url
+        return (base, self.config_base, self.vars, self.cache_in_memory, self.silent,
+                self.workers, self.executor, self.io_workers, self.cache_joins, self.locking, self.lock_timeout,
+                self.cache_dir, self.stores["shared_memory"].ensure() if "shared_memory" in self.stores else None)
 
     def __setstate__(self, state):
-        base, config_base, vars, cache_in_memory = state
-        return self.__init__(base, config_base, clear_cache=False, clear_tmp=False,
-                             cache_in_memory=cache_in_memory, **vars)
+        (base, config_base, vars, cache_in_memory, silent, workers, executor, io_workers, cache_joins,
+         locking, lock_timeout, cache_dir, session) = state
+        self.__init__(base, config_base, clear_cache=False, clear_tmp=False,
+                      cache_in_memory=cache_in_memory, silent=silent,
+                      workers=workers, executor=executor, io_workers=io_workers,
+                      cache_joins=cache_joins, locking=locking, lock_timeout=lock_timeout,
+                      cache_dir=cache_dir, **vars)
+        if session is not None and "shared_memory" in self.stores:
+            self.stores["shared_memory"].join(session)
 
     def _format_path(self, path, vars=None):
         vars = {} if vars is None else vars
         formatter = PartialStringFormatter(**self.vars)
+        formatter.update(recipe_vars.get())
         formatter.update(vars)
         return Formatter().vformat(path, (), formatter)
 
     def real_path(self, path_node, check_existing=True, **vars):
+        with self.tracer.span("resolve", path_node):
+            return self._real_path(path_node, check_existing, vars)
+
+    def _real_path(self, path_node, check_existing, vars):
         path = self._format_path(path_node, vars)
         if re.search(r"{[\w\d\-_]+?}", path) is not None:
             pattern = Formatter().vformat(os.path.join(self.base, self.expand_path(path)), {}, GlobTrans())
-            return [f[len(self.base):].strip("/") for f in glob(pattern, recursive=True)] or None
+            files = glob(pattern, recursive=True) if self.storage is None else self.storage.glob(pattern)
+            return [f[len(self.base):].strip("/") for f in files] or None
         else:
             real_path = os.path.realpath(os.path.join(self.base, path))
-            if check_existing and not self.stores[self.config[path_node].type].exists(real_path):
-                return None
+            if check_existing:
+                data_store = self.stores[self.config[path_node].type]
+                if data_store.PERSISTENT and self.storage is not None:
+                    if not self.storage.exists(real_path):
+                        self._drop_local(real_path, data_store)
+                        return None
+                elif not data_store.exists(real_path):
+                    return None
+                if not self._partition_exists(path_node, real_path, vars):
+                    return None
             return real_path
 
     def exists(self, path, **vars):
@@ -117,74 +202,325 @@ class DataSource:
 
     def open(self, path, mode, **vars):
         real_path = self.real_path(path, check_existing=False, **vars)
-        dir_path = os.path.split(real_path)[0]
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path)
+        os.makedirs(os.path.split(real_path)[0], exist_ok=True)
         return open(real_path, mode)
 
-    def load(self, path, generate=True, callback=None, **vars):
+    def load(self, path, generate=True, callback=None, columns=None, where=None, concat=False, **vars):
+        if not self.tracer.enabled:
+            return self._load(path, generate, callback, columns, where, concat, vars)
+        with self.tracer.span("load", self._format_path(path, vars)) as span:
+            data = self._load(path, generate, callback, columns, where, concat, vars)
+            span.measure(data)
+            return data
+
+    def _load(self, path, generate, callback, columns, where, concat, vars):
         path = self.expand_path(path, vars)
         real_path = self.real_path(path, check_existing=True, **vars)
-        if not isinstance(real_path, list) and real_path in self.mem_cache:
-            return self.mem_cache[real_path]
+        where = predicates.normalize(where) + self._partition_where(path, vars)
+        if self.cache_in_memory and not isinstance(real_path, list) and real_path is not None:
+            data = self.mem_cache.get(real_path)
+            if data is not None:
+                self._trace_load(path, **vars)
+                return self._project(predicates.apply(data, where), path, columns)
         if real_path is None:
             if generate:
                 df = self.generate(path, callback=callback, **vars)
+                df = self._project(predicates.apply(df, where), path, columns)
                 if isinstance(df, pd.DataFrame):
                     setattr(df, "ds_real_path", self.real_path(path, **vars))
                 return df
         elif isinstance(real_path, list):
-            return [self.load(path, generate=False) for path in real_path]
+            placeholders = [self.config.index.extract(path, f) for f in real_path]
+            pruning, where = predicates.split(where, set().union(*placeholders))
+            if pruning:
+                keep = predicates.mask(pd.DataFrame(placeholders), pruning).tolist()
+                real_path = [f for f, k in zip(real_path, keep) if k]
+                placeholders = [v for v, k in zip(placeholders, keep) if k]
+            data = load_many(self, real_path, columns=columns, where=where)
+            if not concat:
+                return data
+            frames = [df.assign(**{k: v for k, v in values.items() if k not in df.columns})
+                      for df, values in zip(data, placeholders)]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
         else:
             data_conf = self.config[path]
-            data = self.stores[data_conf.type].load(real_path, data_conf)
-            for hooks in self.hooks:
-                if path in hooks.load_hooks:
-                    data = hooks.load_hooks[path](self, data)
-            if not data_conf.free_fields:
-                data = data.reindex(columns=data_conf.fields.keys())
-
-                fields = {}
-                for k, v in data_conf.fields.items():
-                    if v == "obj":
-                        continue
-                    elif v == "bytes":
-                        data[k] = data[k].str.decode("utf-8")
-                        v = "str"
-                    fields[k] = v
-
-                # fields = {k: v for k, v in data_conf.fields.items() if v != "obj"}
-                data = data.astype(dtype=fields, copy=False)
-            if self.cache_in_memory:
-                self.mem_cache[real_path] = data
+            hooks = self._load_hooks(path)
+            load_columns, store_columns = self._load_columns(hooks, columns, where)
+            self._fetch(real_path, data_conf)
+            with self.tracer.span("read", os.path.relpath(real_path, self.base)) as span:
+                data = self.stores[data_conf.type].load(real_path, data_conf, columns=store_columns,
+                                                        where=None if hooks else where)
+                if self.tracer.enabled:
+                    span.set(file_bytes=file_size(real_path), **measure(data))
+            data = self._prepare(data, data_conf, hooks, columns, load_columns, where)
+            if self.cache_in_memory and columns is None and not where:
+                self.mem_cache.put(real_path, data)
+            if isinstance(data, pd.DataFrame) and not where:
+                self.table_stats.record(real_path, self.stores[data_conf.type].fingerprint(real_path),
+                                        rows=len(data))
             if isinstance(data, pd.DataFrame):
                 setattr(data, "ds_real_path", real_path)
+            self._trace_load(path, **vars)
+            return data
+
+    def _partition_vars(self, path, vars):
+        fields = store.partition_by(self.config[path])
+        if not fields:
+            return {}
+        values = dict(self.vars, **recipe_vars.get())
+        values.update(vars)
+        return {f: values[f] for f in fields if f in values}
+
+    def _partition_exists(self, path, real_path, vars):
+        partitions = self._partition_vars(path, vars)
+        if not partitions:
+            return True
+        parts = []
+        for field in store.partition_by(self.config[path]):
+            if not partitions:
+                break
+            value = partitions.pop(field, None)
+            parts.append("{}=*".format(field) if value is None else "{}={}".format(field, quote(str(value), safe="")))
+        pattern = os.path.join(real_path, *parts)
+        return bool(glob(pattern) if self.storage is None else self.storage.glob(pattern))
+
+    def _partition_where(self, path, vars):
+        where = []
+        for field, value in self._partition_vars(path, vars).items():
+            try:
+                value = pd.api.types.pandas_dtype(self.config[path].fields.get(field, "str")).type(value)
+            except (TypeError, ValueError):
+                pass
+            where.append((field, "==", value))
+        return where
+
+    def _load_hooks(self, path):
+        return [hooks.load_hooks[path] for hooks in self.hooks if path in hooks.load_hooks]
+
+    def _dump_hooks(self, path):
+        return [hooks.dump_hooks[path] for hooks in self.hooks if path in hooks.dump_hooks]
+
+    @staticmethod
+    def _load_columns(hooks, columns, where):
+        load_columns = columns
+        if columns is not None and where:
+            load_columns = columns + [f for f in predicates.fields_of(where) if f not in columns]
+        store_columns = load_columns
+        if columns is not None:
+            for hook in hooks:
+                if getattr(hook, "requires", None) is None:
+                    store_columns = None
+                    break
+                store_columns = store_columns + [c for c in hook.requires if c not in store_columns]
+        return load_columns, store_columns
+
+    def _prepare(self, data, data_conf, hooks, columns, load_columns, where):
+        for hook in hooks:
+            with self.tracer.span("hook", "{} <{}>".format(data_conf.path, hook.__name__)) as span:
+                if columns is not None and "columns" in inspect.signature(hook).parameters:
+                    data = hook(self, data, columns=columns)
+                else:
+                    data = hook(self, data)
+                span.measure(data)
+        if not data_conf.free_fields:
+            with self.tracer.span("coerce", data_conf.path) as span:
+                data = coercion.load_plan(data_conf).apply(data, load_columns)
+                span.measure(data)
+        if where:
+            data = predicates.apply(data, where)
+            if columns is not None:
+                data = data[[c for c in data.columns if c in columns]]
+        if data_conf.free_fields and columns is not None:
+            data = self.stores[data_conf.type].project(data, columns)
+        return data
+
+    def _coerce_dump(self, data, data_conf):
+        if not data_conf.free_fields:
+            data = coercion.dump_plan(data_conf).apply(data)
+        return data
+
+    def iter_load(self, path, chunksize=100000, columns=None, where=None, generate=True, **vars):
+        path = self.expand_path(path, vars)
+        real_path = self.real_path(path, check_existing=True, **vars)
+        where = predicates.normalize(where) + self._partition_where(path, vars)
+        if real_path is None and generate:
+            self.build(path, **vars)
+            real_path = self.real_path(path, check_existing=True, **vars)
+        if real_path is None:
+            return
+        elif isinstance(real_path, list):
+            for path in real_path:
+                yield from self.iter_load(path, chunksize, columns=columns, where=where, generate=False)
+        else:
+            data_conf = self.config[path]
+            hooks = self._load_hooks(path)
+            load_columns, store_columns = self._load_columns(hooks, columns, where)
+            self._fetch(real_path, data_conf)
+            self._trace_load(path, **vars)
+            chunks = self.stores[data_conf.type].iter_load(real_path, data_conf, chunksize,
+                                                           columns=store_columns, where=None if hooks else where)
+            for chunk in chunks:
+                yield self._prepare(chunk, data_conf, hooks, columns, load_columns, where)
+
+    def _project(self, data, path, columns):
+        if columns is None or not isinstance(data, pd.DataFrame):
             return data
+        if not self.config[path].free_fields:
+            return data.reindex(columns=[c for c in columns if c in self.config[path].fields])
+        return store.DataStore.project(data, columns)
+
+    def _trace_load(self, path, **vars):
+        trace = load_trace.get()
+        if trace is not None:
+            trace[self._format_path(path, vars)] = self.fingerprint(path, **vars)
+
+    def table_stats_of(self, path, **vars):
+        path = self.expand_path(path, vars)
+        real_path = self.real_path(path, check_existing=True, **vars)
+        if real_path is None or isinstance(real_path, list):
+            return None
+        data_conf = self.config[path]
+        data_store = self.stores[data_conf.type]
+        fingerprint = data_store.fingerprint(real_path)
+        entry = self.table_stats.get(real_path, fingerprint)
+        if entry is None or entry["rows"] is None:
+            entry = self.table_stats.record(real_path, fingerprint, rows=data_store.num_rows(real_path, data_conf))
+        return entry
+
+    def fingerprint(self, path, **vars):
+        path = self.expand_path(path, vars)
+        real_path = self.real_path(path, check_existing=True, **vars)
+        if real_path is None or isinstance(real_path, list):
+            return None
+        data_conf = self.config[path]
+        return self.stores[data_conf.type].fingerprint(real_path, getattr(data_conf, "fingerprint", "mtime"))
 
-    def dump(self, path, data, **vars):
+    def dump(self, path, data, append=False, **vars):
+        if isinstance(data, LazyFrame):
+            data = data.collect()
         path = self.expand_path(path, vars)
         real_path = self.real_path(path, check_existing=False, **vars)
         if not real_path: raise SystemError
         data_conf = self.config[path]
-        if not data_conf.free_fields:
-            data = data.reindex(columns=data_conf.fields.keys())
-            fields = {}
-            for k, v in data_conf.fields.items():
-                if v in ["obj", "bytes"]:
-                    continue
-                fields[k] = v
-            # fields = {k: v for k, v in data_conf.fields.items() if v != "obj"}
-            data = data.astype(dtype=fields, copy=False)
+        partitions = self._partition_vars(path, vars)
+        if partitions:
+            data = data.assign(**partitions)
+        with self.tracer.span("coerce", path) as span:
+            data = self._coerce_dump(data, data_conf)
+            span.measure(data)
         _data = data
-        for hooks in self.hooks:
-            if path in hooks.dump_hooks:
-                data = hooks.dump_hooks[path](self, data)
-        dir_path = os.path.split(real_path)[0]
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path)
-        self.stores[data_conf.type].dump(real_path, data, data_conf)
+        for hook in self._dump_hooks(path):
+            with self.tracer.span("hook", "{} <{}>".format(path, hook.__name__)):
+                data = hook(self, data)
+        os.makedirs(os.path.split(real_path)[0], exist_ok=True)
+        if append or partitions:
+            self._fetch(real_path, data_conf)
+        with self.tracer.span("dump", os.path.relpath(real_path, self.base)) as span:
+            if append:
+                self.stores[data_conf.type].append(real_path, data, data_conf)
+            elif partitions:
+                self.stores[data_conf.type].write_partitions(real_path, [data], data_conf, mode="r")
+            else:
+                with self.stores[data_conf.type].atomic(real_path) as target:
+                    self.stores[data_conf.type].dump(target, data, data_conf)
+            if self.tracer.enabled:
+                span.set(file_bytes=file_size(real_path), **measure(data))
+        self._push(real_path, data_conf)
+        self._invalidate(real_path)
         return _data
 
+    def dump_iter(self, path, chunks, **vars):
+        path = self.expand_path(path, vars)
+        real_path = self.real_path(path, check_existing=False, **vars)
+        if not real_path: raise SystemError
+        data_conf = self.config[path]
+        hooks = self._dump_hooks(path)
+        partitions = self._partition_vars(path, vars)
+
+        def prepare():
+            for chunk in chunks:
+                if partitions:
+                    chunk = chunk.assign(**partitions)
+                chunk = self._coerce_dump(chunk, data_conf)
+                for hook in hooks:
+                    chunk = hook(self, chunk)
+                yield chunk
+
+        os.makedirs(os.path.split(real_path)[0], exist_ok=True)
+        if partitions:
+            self._fetch(real_path, data_conf)
+        with self.tracer.span("dump", os.path.relpath(real_path, self.base)) as span:
+            if partitions:
+                self.stores[data_conf.type].write_partitions(real_path, prepare(), data_conf, mode="r")
+            else:
+                with self.stores[data_conf.type].atomic(real_path) as target:
+                    self.stores[data_conf.type].dump_iter(target, prepare(), data_conf)
+            if self.tracer.enabled:
+                span.set(file_bytes=file_size(real_path))
+        self._push(real_path, data_conf)
+        self._invalidate(real_path)
+
+    def dump_many(self, path, parts, **vars):
+        pattern = self.expand_path(path, vars)
+        data_conf = self.config[pattern]
+        fields = store.partition_by(data_conf)
+        if fields:
+            return self._dump_partitioned(path, parts, fields, vars)
+        data_store = self.stores[data_conf.type]
+        hooks = self._dump_hooks(pattern)
+        plan = None if data_conf.free_fields else coercion.dump_plan(data_conf)
+        if plan is not None and isinstance(parts, MultiData) and parts.frame is not None:
+            with self.tracer.span("coerce", pattern) as span:
+                flat = plan.apply(parts.flat())
+                span.measure(flat)
+            parts, plan = parts.split(flat), None
+
+        def targets():
+            dirs = {}
+            for data, svars in parts:
+                _vars = dict(vars, **svars)
+                head, tail = os.path.split(os.path.join(self.base, self._format_path(pattern, _vars)))
+                if head not in dirs:
+                    os.makedirs(head, exist_ok=True)
+                    dirs[head] = os.path.realpath(head)
+                yield data, os.path.join(dirs[head], tail), _vars
+
+        def write(data, real_path, _vars):
+            if plan is not None:
+                data = plan.apply(data)
+            for hook in hooks:
+                data = hook(self, data)
+            with data_store.atomic(real_path) as target:
+                data_store.dump(target, data, data_conf)
+            self._push(real_path, data_conf)
+            return real_path, _vars
+
+        dumped = []
+        with self.tracer.span("dump", pattern) as span:
+            with ThreadPoolExecutor(max(self.io_workers, 1)) as pool:
+                for real_path, _vars in bounded_map(pool, write, targets(), 2 * max(self.io_workers, 1)):
+                    self._invalidate(real_path)
+                    dumped.append((path, _vars, real_path if data_store.PERSISTENT else None))
+            span.set(parts=len(dumped))
+        return dumped
+
+    def _dump_partitioned(self, path, parts, fields, vars):
+        dumped = []
+        partitioned = {}
+        for data, svars in parts:
+            _vars = dict(vars, **svars)
+            if not svars:
+                self.dump(path, data, **_vars)
+                dumped.append((path, _vars, None))
+                continue
+            _vars = {k: v for k, v in _vars.items() if k not in fields or k in vars}
+            key = tuple(sorted(_vars.items()))
+            partitioned.setdefault(key, []).append(data.assign(**{k: v for k, v in svars.items() if k in fields}))
+        for key, chunks in partitioned.items():
+            self.dump_iter(path, iter(chunks), **dict(key))
+            dumped.append((path, dict(key), None))
+        return dumped
+
     def delete(self, path, **vars):
         path = self.expand_path(path, vars)
         real_path = self.real_path(path, check_existing=False, **vars)
@@ -194,6 +530,37 @@ class DataSource:
                 shutil.rmtree(real_path)
             else:
                 self.stores[self.config[path].type].delete(real_path)
+        if self.storage is not None:
+            self.storage.remove(real_path)
+        self._invalidate(real_path)
+
+    def _fetch(self, real_path, data_conf):
+        if self.storage is not None and self.stores[data_conf.type].PERSISTENT:
+            with self.tracer.span("fetch", os.path.relpath(real_path, self.base)):
+                if self.storage.fetch(real_path):
+                    return True
+            self._drop_local(real_path, self.stores[data_conf.type])
+        return False
+
+    def _drop_local(self, real_path, data_store):
+        if os.path.exists(real_path):
+            data_store.delete(real_path)
+            self._invalidate(real_path)
+        self.storage.forget(real_path)
+
+    def _push(self, real_path, data_conf):
+        if self.storage is not None and self.stores[data_conf.type].PERSISTENT:
+            with self.tracer.span("push", os.path.relpath(real_path, self.base)):
+                self.storage.push(real_path)
+
+    def _invalidate(self, real_path):
+        self._invalidate_cached(real_path)
+        self.manifests.delete(real_path)
+
+    def _invalidate_cached(self, real_path):
+        self.mem_cache.invalidate(real_path)
+        self.join_cache.invalidate_path(real_path)
+        self.table_stats.invalidate(real_path)
 
     @contextmanager
     def update(self, paths, **vars):
@@ -206,50 +573,139 @@ class DataSource:
     def search_fields(self, *fields):
         return sorted(list(self.config.search_fields(*fields)), key=lambda x: len(x[1]))
 
+    def plan(self, path, rebuild="missing", **vars):
+        path = self.expand_path(path, vars)
+        return Planner(self, rebuild=rebuild).plan(path, **vars)
+
     def search_recipes(self, path, **vars):
-        if self.exists(path, **vars):
+        plan = self.plan(path, **vars)
+        if plan.state == EXISTS:
             return True
-        else:
-            for cookbook in self.cookbooks:
-                for recipe in cookbook.search(path):
-                    steps = []
-                    for ingredient in recipe.ingredients:
-                        sr = self.search_recipes(ingredient, **vars)
-                        if not sr:
-                            steps = None
-                            break
-                        elif isinstance(sr, list):
-                            steps.extend(sr)
-                    if steps is not None:
-                        steps.append(recipe)
-                        return steps
+        elif plan.state == UNBUILDABLE:
             return False
+        else:
+            return [step.recipe for step in plan]
 
-    def generate_by_recipe(self, recipe, **vars):
-        if all(self.exists(i, **vars) for i in recipe.dishes):
-            return
-        from_data = [self.load(path, **vars) for path in recipe.ingredients]
-        if not self.silent:
-            print("{} => {} By <{}>".format(recipe.ingredients, recipe.dishes, recipe.name))
+    def condiments(self, vars):
         condiments = copy(self.config.PARAMS)
         condiments.update(self.vars)
         condiments.update(vars)
-        for path, data, svars in recipe.cook(from_data, **condiments):
-            _vars = deepcopy(vars)
-            _vars.update(svars)
-            self.dump(path, data, **_vars)
+        return condiments
+
+    def generate_by_recipe(self, recipe, check_existing=True, ingredients=None, **vars):
+        if check_existing and all(self.exists(i, **vars) for i in recipe.dishes):
+            return
+        paths = self._lock_paths(recipe, vars) if self.locking else []
+        if not paths:
+            return self._cook_recipe(recipe, ingredients, vars)
+        with locked(paths, timeout=self.lock_timeout):
+            if all(self.exists(d, **vars) and not self.is_stale(d, **vars) for d in recipe.dishes):
+                for path in paths:
+                    self._invalidate_cached(path)
+                return
+            self._cook_recipe(recipe, ingredients, vars)
+
+    def _lock_paths(self, recipe, vars):
+        paths = []
+        for dish in recipe.dishes:
+            _vars = dict(vars)
+            path = self.expand_path(dish, _vars)
+            if not self.stores[self.config[path].type].PERSISTENT:
+                continue
+            real_path = self.real_path(path, check_existing=False, **_vars)
+            if isinstance(real_path, str):
+                paths.append(real_path)
+        return paths
+
+    def _cook_recipe(self, recipe, ingredients, vars):
+        condiments = self.condiments(vars)
+        inputs = {}
+        dumped = []
+        token = recipe_vars.set(dict(recipe_vars.get(), **vars))
+        trace_token = load_trace.set(inputs)
+        try:
+            with self.tracer.span("cook", recipe.name, **vars):
+                if recipe.stream:
+                    from_data = [self.iter_load(path, chunksize=recipe.chunksize, **vars)
+                                 for path in recipe.ingredients]
+                elif ingredients is not None:
+                    for path in recipe.ingredients:
+                        _vars = dict(vars)
+                        self._trace_load(self.expand_path(path, _vars), **_vars)
+                    from_data = list(ingredients)
+                else:
+                    from_data = [self.load(path, **vars) for path in recipe.ingredients]
+                if not self.silent:
+                    print("{} => {} By <{}>".format(recipe.ingredients, recipe.dishes, recipe.name))
+                for path, dish in recipe.serve(from_data, **condiments):
+                    if isinstance(dish, MultiData):
+                        dumped.extend(self.dump_many(path, dish, **vars))
+                        continue
+                    if isinstance(dish, Iterator):
+                        self.dump_iter(path, dish, **vars)
+                    else:
+                        self.dump(path, dish, **vars)
+                    dumped.append((path, dict(vars), None))
+        finally:
+            load_trace.reset(trace_token)
+            recipe_vars.reset(token)
+        record = {
+            "recipe": recipe.name,
+            "source": recipe.source_hash,
+            "condiments": {k: repr(v) for k, v in recipe.accepts(condiments).items()},
+            "inputs": inputs,
+        }
+        for path, _vars, real_path in dumped:
+            if real_path is not None:
+                self.manifests.write(real_path, record)
+                continue
+            path = self.expand_path(path, _vars)
+            real_path = self.real_path(path, check_existing=False, **_vars)
+            if self.fingerprint(path, **_vars) is not None:
+                self.manifests.write(real_path, record)
+
+    def is_stale(self, path, **vars):
+        path = self.expand_path(path, vars)
+        real_path = self.real_path(path, check_existing=True, **vars)
+        if real_path is None:
+            return True
+        elif isinstance(real_path, list):
+            return False
+        record = self.manifests.read(real_path)
+        if record is None:
+            return False
+        recipe = None
+        for cookbook in self.cookbooks:
+            for r in cookbook.search(path):
+                if r.name == record["recipe"]:
+                    recipe = recipe or r
+        if recipe is None or recipe.source_hash != record["source"]:
+            return True
+        condiments = {k: repr(v) for k, v in recipe.accepts(self.condiments(vars)).items()}
+        if condiments != record["condiments"]:
+            return True
+        for input_path, fingerprint in record["inputs"].items():
+            try:
+                if self.fingerprint(input_path) != fingerprint:
+                    return True
+            except KeyError:
+                return True
+        return False
 
     def can_generate(self, path, **vars):
+        return self.plan(path, **vars).state != UNBUILDABLE
+
+    def generate(self, path, callback=None, rebuild="missing", **vars):
         path = self.expand_path(path, vars)
-        recipe = self.search_recipes(path, **vars)
-        return recipe is not False
+        self.build(path, callback=callback, rebuild=rebuild, **vars)
+        return self.load(path, generate=False, **vars)
 
-    def generate(self, path, callback=None, **vars):
+    def build(self, path, callback=None, rebuild="missing", **vars):
         path = self.expand_path(path, vars)
         if not self.silent:
             print("Generating", self._format_path(path, vars))
-        steps = self.search_recipes(path, **vars)
-        if not steps:
+        plan = self.plan(path, rebuild=rebuild, **vars)
+        if plan.state == UNBUILDABLE:
             if callback:
                 data = callback()
                 self.dump(path, data, **vars)
@@ -258,23 +714,32 @@ class DataSource:
                 for cookbook in self.cookbooks:
                     cookbook.list_recipes()
                 raise SystemError
-        elif isinstance(steps, list):
-            for recipe in steps:
-                if recipe is not True:
-                    self.generate_by_recipe(recipe, **vars)
-        return self.load(path, generate=False, **vars)
+        else:
+            PlanExecutor(self, self.workers, self.executor).run(plan)
+        if self.catalog.dirty:
+            self.save_catalog()
+
+    def generate_all(self, path, variants, rebuild="missing"):
+        path = self.expand_path(path)
+        variants = [dict(self.vars, **vars) for vars in variants]
+        plan = Planner(self, rebuild=rebuild).plan_all(path, variants)
+        if plan.state == UNBUILDABLE:
+            missing = [t for t, (s, _) in plan.nodes.items() if t in plan.target and s == UNBUILDABLE]
+            raise SystemError("Cannot find any recipe for {}".format(missing))
+        if not self.silent:
+            print("Generating {} targets in {} steps".format(len(plan.target), len(plan)))
+        PlanExecutor(self, self.workers, self.executor).run(plan)
+        if self.catalog.dirty:
+            self.save_catalog()
 
     def related_data(self, fields, path=None):
         path = [] if path is None else path
         unknown_fields = set(fields)
         related_data = []
-        for other_path, fields in self.search_fields(*fields):
+        for other_path, fields in self.config.cover_fields(*fields):
             if other_path in path: continue
             related_data.append((other_path, fields))
-            for f in fields:
-                if f in unknown_fields:
-                    unknown_fields.remove(f)
-        related_data.sort(key=lambda x: len(x[1]), reverse=True)
+            unknown_fields -= fields
         return related_data, unknown_fields
 
     def show_related_data(self, path, **vars):
@@ -301,56 +766,89 @@ class DataSource:
     def params(self):
         return self.config.PARAMS
 
-    def autogen_scheme(self, path_or_fields, skip_path=None):
+    def explain(self, path_or_fields, how="inner", skip_path=None, where=None):
         skip_path = [] if skip_path is None else skip_path
         if isinstance(path_or_fields, str):
             skip_path.append(path_or_fields)
             path_or_fields = self.fields(path_or_fields)
+        return JoinPlanner(self).plan(list(path_or_fields), skip_path=skip_path, how=how, where=where)
 
-        rfs = self.related_data(path_or_fields, path=skip_path)[0]
-        needs = set(path_or_fields)
-        gets = set()
-
-        if not rfs:
-            return None, [], needs
-
-        path, fields = rfs[0]
-        needs -= fields
-        gets |= fields
-        base = (path, list(fields))
-
-        joins = []
-        can_join = True
-        while needs and can_join:
-            can_join = False
-            for p, fields in rfs[1:]:
-                if self.can_generate(p) and fields & gets and fields & needs:
-                    keys = fields & gets
-                    joins.append((p, list(keys), list((fields - gets) | keys)))
-                    gets |= fields
-                    needs -= fields
-                    can_join = True
-
-        return base, joins, needs, path_or_fields
-
-    def autogen(self, path_or_fields, how="inner", skip_path=None):
-        skip_path = [] if skip_path is None else skip_path
-        base, joins, unknown, fs = self.autogen_scheme(path_or_fields, skip_path=skip_path)
-        data = self.load(base[0])[base[1]].copy()
-        if not self.silent:
-            print("Base: ", base[0])
-        for path, keys, fields in joins:
+    def autogen_scheme(self, path_or_fields, skip_path=None):
+        return self.explain(path_or_fields, skip_path=skip_path).as_scheme()
+
+    def _join_input(self, step):
+        data = self.load(step.path, columns=step.fields, where=step.where)
+        missing = [k for k in step.keys if k not in step.ndv]
+        if missing and not step.where and isinstance(data, pd.DataFrame):
+            entry = self.table_stats_of(step.path)
+            if entry is not None:
+                entry["ndv"].update({k: int(data[k].nunique()) for k in missing})
+        return data
+
+    def _join_key(self, plan):
+        paths = []
+        for step in [plan.base] + plan.joins:
+            path = self.expand_path(step.path, {})
+            real_path = self.real_path(path, check_existing=True)
+            if real_path is None or isinstance(real_path, list):
+                return None, ()
+            paths.append((real_path, self.stores[self.config[path].type].fingerprint(real_path)))
+        if any(fingerprint is None for _, fingerprint in paths):
+            return None, ()
+        where = repr(sorted(map(repr, plan.where + [p for s in [plan.base] + plan.joins for p in s.where])))
+        return repr((plan.fields, plan.how, where, paths)), [p for p, _ in paths]
+
+    def autogen(self, path_or_fields, how="inner", skip_path=None, where=None):
+        plan = self.explain(path_or_fields, how=how, skip_path=skip_path, where=where)
+        if plan.base is None:
+            raise KeyError("No data provides fields {}".format(sorted(plan.unknown)))
+        with self.tracer.span("autogen", ",".join(plan.fields)) as span:
+            if self.cache_joins:
+                key, _ = self._join_key(plan)
+                data = None if key is None else self.join_cache.get(key)
+                if data is not None:
+                    span.set(cached=True, **measure(data))
+                    return cow_copy(data), plan.unknown
+            data = self._join_input(plan.base)
             if not self.silent:
-                print("Joining:", path)
-            data = data.merge(self.load(path)[fields], on=keys, how=how, copy=False)
-        data = data.reindex(columns=fs, copy=False)
-        return data, unknown
+                print("Base: ", plan.base.path)
+            for step in plan.joins:
+                if not self.silent:
+                    print("Joining:", step.path)
+                right = self._join_input(step)
+                with self.tracer.span("join", step.path) as join_span:
+                    data = data.merge(right, on=step.keys, how=how)
+                    join_span.measure(data)
+            data = predicates.apply(data, plan.where)
+            data = data.reindex(columns=plan.fields)
+            span.measure(data)
+            if self.cache_joins:
+                key, paths = self._join_key(plan)
+                if key is not None:
+                    self.join_cache.put(key, data, paths)
+                    data = cow_copy(data)
+            return data, plan.unknown
+
+    @contextmanager
+    def profile(self, show=True, top=20, trace_path=None):
+        recorder = self.tracer.add_sink(TraceRecorder())
+        try:
+            yield recorder
+        finally:
+            self.tracer.remove_sink(recorder)
+            if trace_path is not None:
+                recorder.dump(trace_path)
+            if show:
+                recorder.show(top)
 
     def __getitem__(self, item):
         if isinstance(item, str):
             item = [item]
         return self.autogen(item)[0]
 
+    def lazy(self):
+        return LazySource(self)
+
     def __getattr__(self, item):
         v = self.config.PARAMS.get(item, None)
         if v is None:
@@ -359,13 +857,18 @@ class DataSource:
             raise AttributeError
         return v
 
-    def filter(self, fields, func, gen_fields=None):
-        data = self[fields]
-        data = data[func(data)]
+    def filter(self, fields, func=None, gen_fields=None, where=None, how="inner"):
+        if isinstance(fields, str):
+            fields = [fields]
+        where = predicates.normalize(where)
+        all_fields = list(fields) + [f for f in predicates.fields_of(where) if f not in fields]
+        data = self.autogen(all_fields, how=how, where=where)[0]
+        if func is not None:
+            data = data[func(data)]
         if gen_fields:
             return data[gen_fields]
         else:
-            return data
+            return data[list(fields)]
 
     @property
     def all_files(self):
@@ -0,0 +1,149 @@
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+class RecipeError(SystemError):
+    def __init__(self, failures, skipped=()):
+        self.failures = failures
+        self.skipped = list(skipped)
+        lines = ["{} recipe(s) failed, {} skipped".format(len(failures), len(self.skipped))]
+        for step, exc in failures:
+            lines.append("  {}: {!r}".format(step, exc))
+        super().__init__("\n".join(lines))
+
+
+def recipe_ref(ds, recipe):
+    for i, cookbook in enumerate(ds.cookbooks):
+        for dish in recipe.dishes:
+            recipes = cookbook.search(dish)
+            for j, r in enumerate(recipes):
+                if r is recipe:
+                    return i, dish, j
+    raise KeyError(recipe.name)
+
+
+def find_recipe(ds, ref):
+    i, dish, j = ref
+    return ds.cookbooks[i].search(dish)[j]
+
+
+def cook_step(ds, recipe, vars, recheck=False):
+    if recheck and not any(ds.is_stale(dish, **vars) for dish in recipe.dishes):
+        return False
+    ds.generate_by_recipe(recipe, check_existing=False, **vars)
+    return True
+
+
+_worker_ds = None
+
+
+def _init_worker(ds):
+    global _worker_ds
+    ds.workers = 1
+    _worker_ds = ds
+
+
+def _cook_in_worker(ref, vars, recheck):
+    return cook_step(_worker_ds, find_recipe(_worker_ds, ref), vars, recheck)
+
+
+def _load_in_worker(path, columns, where):
+    return _worker_ds.load(path, generate=False, columns=columns, where=where)
+
+
+def bounded_map(pool, func, items, limit):
+    pending = deque()
+    for item in items:
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+        pending.append(pool.submit(func, *item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def load_many(ds, paths, columns=None, where=None):
+    workers = min(ds.io_workers, len(paths))
+    if workers <= 1:
+        return [ds.load(path, generate=False, columns=columns, where=where) for path in paths]
+    if ds.executor == "process":
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(ds,)) as pool:
+            data = list(bounded_map(pool, _load_in_worker, [(path, columns, where) for path in paths], 2 * workers))
+        for path in paths:
+            ds._trace_load(path)
+        return data
+    items = ((contextvars.copy_context(), path) for path in paths)
+    func = lambda context, path: context.run(ds.load, path, generate=False, columns=columns, where=where)
+    with ThreadPoolExecutor(workers) as pool:
+        return list(bounded_map(pool, func, items, 2 * workers))
+
+
+class PlanExecutor:
+    def __init__(self, ds, workers=1, executor="thread"):
+        if executor not in EXECUTORS:
+            raise ValueError("Unknown executor \"{}\", expected one of {}".format(executor, list(EXECUTORS)))
+        self.ds = ds
+        self.workers = workers
+        self.executor = executor
+
+    def run(self, plan):
+        steps = list(plan)
+        failed = set()
+        failures = []
+        skipped = []
+        if self.workers <= 1 or len(steps) <= 1:
+            for step in steps:
+                if any(d in failed for d in step.deps):
+                    failed.add(step)
+                    skipped.append(step)
+                    continue
+                try:
+                    cook_step(self.ds, step.recipe, step.vars, step.recheck)
+                except Exception as exc:
+                    failed.add(step)
+                    failures.append((step, exc))
+        else:
+            self._run_pool(steps, failed, failures, skipped)
+        if failures:
+            raise RecipeError(failures, skipped) from failures[0][1]
+
+    def _run_pool(self, steps, failed, failures, skipped):
+        if self.executor == "process":
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.ds,))
+            submit = lambda step: pool.submit(_cook_in_worker, recipe_ref(self.ds, step.recipe),
+                                              step.vars, step.recheck)
+        else:
+            pool = ThreadPoolExecutor(self.workers)
+            submit = lambda step: pool.submit(cook_step, self.ds, step.recipe, step.vars, step.recheck)
+
+        waiting = list(steps)
+        running = {}
+        done = set()
+        with pool:
+            while waiting or running:
+                blocked = []
+                for step in waiting:
+                    if any(d in failed for d in step.deps):
+                        failed.add(step)
+                        skipped.append(step)
+                    elif all(d in done for d in step.deps):
+                        running[submit(step)] = step
+                    else:
+                        blocked.append(step)
+                waiting = blocked
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    exc = future.exception()
+                    if exc is None:
+                        done.add(step)
+                    else:
+                        failed.add(step)
+                        failures.append((step, exc))
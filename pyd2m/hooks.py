@@ -3,8 +3,9 @@ class Hooks:
         self.load_hooks = {}
         self.dump_hooks = {}
 
-    def load(self, path):
+    def load(self, path, requires=None):
         def wrapper(func):
+            func.requires = requires
             self.load_hooks[path] = func
             return func
 
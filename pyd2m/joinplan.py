@@ -0,0 +1,183 @@
+from threading import Lock
+
+from . import predicates
+
+SELECTIVITY = {
+    "==": 0.1,
+    "=": 0.1,
+    "!=": 0.9,
+    "not in": 0.9,
+}
+RANGE_SELECTIVITY = 0.33
+
+
+def selectivity(where):
+    s = 1.0
+    for _, op, value in where:
+        if op == "in":
+            s *= min(1.0, 0.1 * len(value))
+        else:
+            s *= SELECTIVITY.get(op, RANGE_SELECTIVITY)
+    return s
+
+
+class TableStats:
+    def __init__(self):
+        self.entries = {}
+        self.lock = Lock()
+
+    def get(self, real_path, fingerprint):
+        entry = self.entries.get(real_path)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return None
+        return entry
+
+    def record(self, real_path, fingerprint, rows=None, ndv=None):
+        with self.lock:
+            entry = self.entries.get(real_path)
+            if entry is None or entry["fingerprint"] != fingerprint:
+                entry = self.entries[real_path] = {"fingerprint": fingerprint, "rows": None, "ndv": {}}
+            if rows is not None:
+                entry["rows"] = rows
+            if ndv:
+                entry["ndv"].update(ndv)
+            return entry
+
+    def invalidate(self, real_path):
+        with self.lock:
+            self.entries.pop(real_path, None)
+
+
+class JoinStep:
+    def __init__(self, path, keys, fields, where=(), rows=None, ndv=None, estimate=None):
+        self.path = path
+        self.keys = keys
+        self.fields = fields
+        self.where = list(where)
+        self.rows = rows
+        self.ndv = ndv or {}
+        self.estimate = estimate
+
+    def describe(self):
+        info = []
+        if self.rows is not None:
+            info.append("rows={:.0f}".format(self.rows))
+        if self.estimate is not None:
+            info.append("est={:.0f}".format(self.estimate))
+        if self.where:
+            info.append("where={}".format(self.where))
+        return " ({})".format(", ".join(info)) if info else ""
+
+
+class JoinPlan:
+    def __init__(self, fields, how="inner"):
+        self.fields = fields
+        self.how = how
+        self.base = None
+        self.joins = []
+        self.where = []
+        self.unknown = set()
+
+    def as_scheme(self):
+        if self.base is None:
+            return None, [], self.unknown, self.fields
+        base = self.base.path, self.base.fields
+        joins = [(s.path, s.keys, s.fields) for s in self.joins]
+        return base, joins, self.unknown, self.fields
+
+    def __repr__(self):
+        if self.base is None:
+            return "<JoinPlan: no data for {}>".format(self.fields)
+        lines = ["Base: {} {}{}".format(self.base.path, self.base.fields, self.base.describe())]
+        for step in self.joins:
+            lines.append("Join ({}): {} on {} {}{}".format(self.how, step.path, step.keys, step.fields,
+                                                            step.describe()))
+        if self.where:
+            lines.append("Filter: {}".format(self.where))
+        if self.unknown:
+            lines.append("Fields not found: {}".format(self.unknown))
+        return "\n".join(lines)
+
+
+class JoinPlanner:
+    def __init__(self, ds):
+        self.ds = ds
+        self.generatable = {}
+
+    def can_generate(self, path):
+        if path not in self.generatable:
+            self.generatable[path] = self.ds.can_generate(path)
+        return self.generatable[path]
+
+    def stats(self, path):
+        entry = self.ds.table_stats_of(path)
+        if entry is None:
+            return None, {}
+        return entry["rows"], entry["ndv"]
+
+    def estimate(self, rows, ndv, step_rows, step_ndv, keys):
+        if rows is None or step_rows is None:
+            return None
+        distinct = max([ndv.get(k) or 0 for k in keys] + [step_ndv.get(k) or 0 for k in keys])
+        if distinct:
+            return rows * step_rows / distinct
+        return max(rows, step_rows)
+
+    def plan(self, fields, skip_path=None, how="inner", where=None):
+        where = predicates.normalize(where)
+        plan = JoinPlan(list(fields), how)
+        candidates, plan.unknown = self.ds.related_data(fields, path=skip_path or [])
+        if not candidates:
+            plan.unknown = set(fields)
+            plan.where = where
+            return plan
+
+        path, fs = candidates[0]
+        rows, ndv = self.stats(path)
+        pushed = predicates.split(where, fs)[0] if how in ("inner", "left") else []
+        if rows is not None and pushed:
+            rows *= selectivity(pushed)
+        plan.base = JoinStep(path, [], list(fs), pushed, rows, ndv, rows)
+        where = [p for p in where if p not in plan.base.where]
+
+        needs = set(fields) - set(fs)
+        gets = set(fs)
+        steps = []
+        joined = True
+        while needs and joined:
+            joined = False
+            for path, fs in candidates[1:]:
+                if fs & gets and fs & needs and self.can_generate(path):
+                    keys = sorted(fs & gets)
+                    steps.append((path, keys, keys + sorted(fs - gets)))
+                    gets |= fs
+                    needs -= fs
+                    joined = True
+
+        available = set(plan.base.fields)
+        rows, ndv = plan.base.rows, dict(plan.base.ndv)
+        while steps:
+            options = []
+            for order, (path, keys, step_fields) in enumerate(steps):
+                if how != "inner" and order > 0:
+                    break
+                if not set(keys) <= available:
+                    continue
+                step_rows, step_ndv = self.stats(path)
+                pushed = predicates.split(where, step_fields)[0] if how == "inner" else []
+                if step_rows is not None and pushed:
+                    step_rows *= selectivity(pushed)
+                estimate = self.estimate(rows, ndv, step_rows, step_ndv, keys)
+                key = (estimate is None, estimate or 0, order)
+                options.append((key, order, JoinStep(path, keys, step_fields, pushed, step_rows, step_ndv, estimate)))
+            _, order, step = min(options, key=lambda x: x[0])
+            del steps[order]
+            plan.joins.append(step)
+            where = [p for p in where if p not in step.where]
+            available |= set(step.fields)
+            rows = step.estimate
+            ndv.update(step.ndv)
+        plan.base.keys = sorted(set(k for s in plan.joins for k in s.keys) & set(plan.base.fields))
+        plan.unknown |= needs
+        plan.where = where
+        return plan
@@ -0,0 +1,302 @@
+import pandas as pd
+
+from . import predicates
+
+
+def needed(columns, where):
+    if columns is None:
+        return None
+    return columns + [f for f in predicates.fields_of(where) if f not in columns]
+
+
+def project(data, columns):
+    if columns is None:
+        return data
+    return data.reindex(columns=columns)
+
+
+class Node:
+    children = ()
+
+    def columns(self):
+        raise NotImplementedError
+
+    def push(self, columns, where):
+        raise NotImplementedError
+
+    def execute(self, ds, columns, where):
+        requests, local = self.push(columns, where)
+        inputs = [child.execute(ds, *request) for child, request in zip(self.children, requests)]
+        return project(predicates.apply(self.combine(inputs), local), columns)
+
+    def combine(self, inputs):
+        raise NotImplementedError
+
+    def label(self, columns, where):
+        raise NotImplementedError
+
+    def explain(self, columns, where, depth=0):
+        lines = ["{}{}".format("  " * depth, self.label(columns, where))]
+        if self.children:
+            requests, local = self.push(columns, where)
+            if local:
+                lines[0] += " then where={}".format(local)
+            for child, request in zip(self.children, requests):
+                lines.extend(child.explain(*request, depth=depth + 1))
+        return lines
+
+
+class Scan(Node):
+    def __init__(self, ds, path, vars):
+        self.ds = ds
+        self.path = path
+        self.vars = vars
+
+    def columns(self):
+        return list(self.ds.fields(self.ds.expand_path(self.path, dict(self.vars))))
+
+    def execute(self, ds, columns, where):
+        data = ds.load(self.path, columns=needed(columns, where), where=where or None, concat=True, **self.vars)
+        return project(data, columns)
+
+    def label(self, columns, where):
+        return "Load {} columns={} where={}".format(self.path, columns, where)
+
+
+class AutoJoin(Node):
+    def __init__(self, ds, fields, how):
+        self.ds = ds
+        self.fields = list(fields)
+        self.how = how
+
+    def columns(self):
+        return self.fields
+
+    def request(self, columns, where):
+        fields = self.fields if columns is None else [f for f in self.fields if f in columns]
+        return needed(fields, where)
+
+    def execute(self, ds, columns, where):
+        data, _ = ds.autogen(self.request(columns, where), how=self.how, where=where or None)
+        return project(data, columns)
+
+    def label(self, columns, where):
+        return "Join {} how={} where={}".format(self.request(columns, where), self.how, where)
+
+
+class Frame(Node):
+    def __init__(self, data):
+        self.data = data
+
+    def columns(self):
+        return self.data.columns.tolist()
+
+    def execute(self, ds, columns, where):
+        return project(predicates.apply(self.data, where), columns)
+
+    def label(self, columns, where):
+        return "Frame {} rows".format(len(self.data))
+
+
+class Project(Node):
+    def __init__(self, child, fields):
+        self.children = (child,)
+        self.fields = list(fields)
+
+    def columns(self):
+        return self.fields
+
+    def push(self, columns, where):
+        fields = self.fields if columns is None else [f for f in self.fields if f in columns]
+        return [(fields, where)], []
+
+    def combine(self, inputs):
+        return inputs[0]
+
+    def label(self, columns, where):
+        return "Select {}".format(self.fields if columns is None else columns)
+
+
+class Filter(Node):
+    def __init__(self, child, where):
+        self.children = (child,)
+        self.where = where
+
+    def columns(self):
+        return self.children[0].columns()
+
+    def push(self, columns, where):
+        return [(columns, where + self.where)], []
+
+    def combine(self, inputs):
+        return inputs[0]
+
+    def label(self, columns, where):
+        return "Filter {}".format(self.where)
+
+
+class Assign(Node):
+    def __init__(self, child, values):
+        self.children = (child,)
+        self.values = values
+
+    def columns(self):
+        return self.children[0].columns() + [c for c in self.values if c not in self.children[0].columns()]
+
+    def push(self, columns, where):
+        local, below = predicates.split(where, self.values)
+        return [(None, below)], local
+
+    def combine(self, inputs):
+        return inputs[0].assign(**self.values)
+
+    def label(self, columns, where):
+        return "Assign {}".format(list(self.values))
+
+
+class Merge(Node):
+    PRESERVED = {"inner": (False, False), "left": (True, False), "right": (False, True), "outer": (True, True)}
+
+    def __init__(self, left, right, how="inner", on=None, left_on=None, right_on=None, suffixes=("_x", "_y")):
+        if isinstance(on, str):
+            on = [on]
+        if isinstance(left_on, str):
+            left_on = [left_on]
+        if isinstance(right_on, str):
+            right_on = [right_on]
+        if on is None and left_on == right_on:
+            on = left_on
+        if how not in self.PRESERVED:
+            raise ValueError("Unsupported merge \"{}\", expected one of {}".format(how, list(self.PRESERVED)))
+        if on is None and left_on is None:
+            common = set(right.columns())
+            on = [c for c in left.columns() if c in common]
+            if not on:
+                raise ValueError("No common columns to merge on")
+        self.children = (left, right)
+        self.how = how
+        self.on = on
+        self.left_on = on if left_on is None else left_on
+        self.right_on = on if right_on is None else right_on
+        self.suffixes = suffixes
+
+    def sides(self):
+        left, right = self.children[0].columns(), self.children[1].columns()
+        overlap = (set(left) & set(right)) - set(self.on or [])
+        names = {}
+        for side, cols, suffix in ((0, left, self.suffixes[0]), (1, right, self.suffixes[1])):
+            for c in cols:
+                if side == 1 and c in (self.on or []):
+                    continue
+                names[c + suffix if c in overlap else c] = (side, c)
+        return names
+
+    def columns(self):
+        return list(self.sides())
+
+    def push(self, columns, where):
+        names = self.sides()
+        keys = (self.left_on or [], self.right_on or [])
+        wanted = names if columns is None else [c for c in columns if c in names]
+        wanted = list(wanted) + [f for f in predicates.fields_of(where) if f in names and f not in wanted]
+        requests = [list(keys[0]), list(keys[1])]
+        for name in wanted:
+            side, column = names[name]
+            if column not in requests[side]:
+                requests[side].append(column)
+        pushed, local = [[], []], []
+        preserved = self.PRESERVED[self.how]
+        for field, op, value in where:
+            side, column = names.get(field, (None, None))
+            if side is not None and not preserved[1 - side]:
+                pushed[side].append((column, op, value))
+                if self.on and column in self.on and not preserved[side]:
+                    pushed[1 - side].append((field, op, value))
+            else:
+                local.append((field, op, value))
+        return [(requests[0], pushed[0]), (requests[1], pushed[1])], local
+
+    def combine(self, inputs):
+        left, right = inputs
+        if self.on:
+            return left.merge(right, on=self.on, how=self.how, suffixes=self.suffixes)
+        return left.merge(right, left_on=self.left_on, right_on=self.right_on, how=self.how, suffixes=self.suffixes)
+
+    def label(self, columns, where):
+        if self.on:
+            return "Merge {} on={}".format(self.how, self.on)
+        return "Merge {} left_on={} right_on={}".format(self.how, self.left_on, self.right_on)
+
+
+class LazyFrame:
+    def __init__(self, ds, node):
+        self.ds = ds
+        self.node = node
+
+    @property
+    def columns(self):
+        return pd.Index(self.node.columns())
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self.collect([item])[item]
+        return LazyFrame(self.ds, Project(self.node, item))
+
+    def filter(self, where):
+        where = predicates.normalize(where)
+        unknown = [f for f in predicates.fields_of(where) if f not in self.node.columns()]
+        if unknown:
+            raise KeyError("Cannot filter on unknown fields {}".format(unknown))
+        return LazyFrame(self.ds, Filter(self.node, where))
+
+    def assign(self, **values):
+        return LazyFrame(self.ds, Assign(self.node, values))
+
+    def merge(self, right, how="inner", on=None, left_on=None, right_on=None, suffixes=("_x", "_y")):
+        if not isinstance(right, LazyFrame):
+            right = LazyFrame(self.ds, Frame(right))
+        return LazyFrame(self.ds, Merge(self.node, right.node, how, on, left_on, right_on, suffixes))
+
+    def collect(self, columns=None):
+        with self.ds.tracer.span("collect", ",".join(self.node.columns())) as span:
+            data = self.node.execute(self.ds, None if columns is None else list(columns), [])
+            span.measure(data)
+            return data
+
+    def explain(self):
+        return "\n".join(self.node.explain(None, []))
+
+    def head(self, n=5):
+        return self.collect().head(n)
+
+    def __len__(self):
+        columns = self.node.columns()
+        return len(self.collect(columns[:1]))
+
+    def __repr__(self):
+        return "<LazyFrame\n{}>".format(self.explain())
+
+
+class LazySource:
+    def __init__(self, ds):
+        self.ds = ds
+
+    def load(self, path, columns=None, where=None, **vars):
+        frame = LazyFrame(self.ds, Scan(self.ds, path, vars))
+        if where is not None:
+            frame = frame.filter(where)
+        return frame if columns is None else frame[list(columns)]
+
+    def autogen(self, path_or_fields, how="inner", where=None):
+        if isinstance(path_or_fields, str):
+            path_or_fields = self.ds.fields(path_or_fields)
+        frame = LazyFrame(self.ds, AutoJoin(self.ds, path_or_fields, how))
+        return frame if where is None else frame.filter(where)
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            item = [item]
+        return self.autogen(item)
+
+    def __getattr__(self, item):
+        return getattr(self.ds, item)
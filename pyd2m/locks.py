@@ -0,0 +1,133 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+
+from .store import remove_temp_files
+
+HOST = socket.gethostname()
+STALE_AFTER = 60.0
+
+
+class LockTimeout(TimeoutError):
+    def __init__(self, path, owner):
+        self.path = path
+        self.owner = owner
+        super().__init__("Timed out waiting for the lock on {} held by {}".format(path, owner))
+
+
+def lock_path(path):
+    head, tail = os.path.split(path)
+    return os.path.join(head, ".{}.lock".format(tail))
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_owner(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(path, stale=STALE_AFTER):
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return False
+    owner = read_owner(path)
+    if isinstance(owner, dict) and owner.get("host") == HOST and owner.get("pid") != os.getpid():
+        if not pid_alive(owner.get("pid")):
+            return True
+    return time.time() - mtime > stale
+
+
+class ArtifactLock:
+    def __init__(self, path, timeout=None, stale=STALE_AFTER, poll=0.05):
+        self.path = path
+        self.lock_path = lock_path(path)
+        self.timeout = timeout
+        self.stale = stale
+        self.poll = poll
+        self.waited = False
+        self.stop = None
+
+    def try_acquire(self):
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({"host": HOST, "pid": os.getpid(), "thread": threading.get_ident(), "time": time.time()}, f)
+        return True
+
+    def break_lock(self):
+        grave = "{}.{}.stale".format(self.lock_path, uuid.uuid4().hex[:8])
+        try:
+            os.rename(self.lock_path, grave)
+        except OSError:
+            return
+        if not is_stale(grave, self.stale):
+            try:
+                os.link(grave, self.lock_path)
+            except OSError:
+                pass
+        else:
+            remove_temp_files(self.path)
+        os.remove(grave)
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self.try_acquire():
+            self.waited = True
+            if is_stale(self.lock_path, self.stale):
+                self.break_lock()
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                raise LockTimeout(self.path, read_owner(self.lock_path))
+            time.sleep(self.poll)
+        self.stop = threading.Event()
+        threading.Thread(target=self.heartbeat, args=(self.stop,), daemon=True).start()
+        return self
+
+    def heartbeat(self, stop):
+        while not stop.wait(self.stale / 4):
+            try:
+                os.utime(self.lock_path)
+            except OSError:
+                return
+
+    def release(self):
+        if self.stop is not None:
+            self.stop.set()
+            self.stop = None
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+@contextmanager
+def locked(paths, timeout=None, stale=STALE_AFTER):
+    with ExitStack() as stack:
+        locks = [stack.enter_context(ArtifactLock(path, timeout, stale)) for path in sorted(set(paths))]
+        yield any(lock.waited for lock in locks)
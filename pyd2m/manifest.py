@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+
+MANIFEST_DIR = os.path.join(".d2m", "manifests")
+
+
+def file_fingerprint(path, method="mtime"):
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, f) for root, _, fs in os.walk(path) for f in fs)
+    else:
+        files = [path]
+    if method == "hash":
+        h = hashlib.sha1()
+        for file in files:
+            h.update(os.path.relpath(file, path).encode("utf-8"))
+            with open(file, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        return h.hexdigest()
+    else:
+        stats = [os.stat(file) for file in files]
+        return [max(s.st_mtime_ns for s in stats), sum(s.st_size for s in stats)]
+
+
+class Manifests:
+    def __init__(self, base):
+        self.base = base
+        self.root = os.path.join(base, MANIFEST_DIR)
+
+    def path_of(self, real_path):
+        return os.path.join(self.root, os.path.relpath(real_path, self.base) + ".json")
+
+    def read(self, real_path):
+        try:
+            with open(self.path_of(real_path), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, real_path, record):
+        path = self.path_of(real_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(record, f, indent=1)
+
+    def delete(self, real_path):
+        path = self.path_of(real_path)
+        if os.path.exists(path):
+            os.remove(path)
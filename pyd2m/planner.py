@@ -0,0 +1,157 @@
+EXISTS = "exists"
+BUILDABLE = "buildable"
+UNBUILDABLE = "unbuildable"
+
+
+class CyclicRecipeError(SystemError):
+    def __init__(self, chain):
+        self.chain = chain
+        super().__init__("Cyclic recipe dependency: {}".format(" -> ".join(chain)))
+
+
+class Step:
+    def __init__(self, recipe, vars, deps, recheck=False):
+        self.recipe = recipe
+        self.vars = vars
+        self.deps = deps
+        self.recheck = recheck
+
+    def __repr__(self):
+        return "{} => {} By <{}>{}{}".format(self.recipe.ingredients, self.recipe.dishes, self.recipe.name,
+                                            " with {}".format(self.vars) if self.vars else "",
+                                            " (if stale)" if self.recheck else "")
+
+
+class Plan:
+    def __init__(self, target, state, steps, nodes):
+        self.target = target
+        self.state = state
+        self.steps = steps
+        self.nodes = nodes
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __repr__(self):
+        return "<Plan {} ({}, {} steps)>".format(self.target, self.state, len(self.steps))
+
+    def show(self):
+        print("{}: {}".format(self.target, self.state))
+        for i, step in enumerate(self.steps):
+            deps = ", ".join(str(self.steps.index(d)) for d in step.deps)
+            print("{:>4}. {}{}".format(i, step, " after [{}]".format(deps) if deps else ""))
+
+
+class Planner:
+    REBUILD_MODES = ("missing", "stale")
+
+    def __init__(self, ds, rebuild="missing"):
+        if rebuild not in self.REBUILD_MODES:
+            raise ValueError("Unknown rebuild mode \"{}\", expected one of {}".format(rebuild, self.REBUILD_MODES))
+        self.ds = ds
+        self.rebuild = rebuild
+        self.nodes = {}
+        self.steps = {}
+        self.visiting = []
+        self.upstream = {}
+        self.recheck = set()
+
+    def recipes(self, path):
+        for cookbook in self.ds.cookbooks:
+            yield from cookbook.search(path)
+
+    def visit(self, path, vars):
+        vars = dict(vars)
+        path = self.ds.expand_path(path, vars)
+        key = self.ds._format_path(path, vars)
+        if key in self.nodes:
+            return self.nodes[key]
+        if key in self.visiting:
+            raise CyclicRecipeError(self.visiting[self.visiting.index(key):] + [key])
+        self.visiting.append(key)
+        try:
+            self.nodes[key] = self.resolve(path, key, vars)
+        finally:
+            self.visiting.pop()
+        return self.nodes[key]
+
+    def resolve(self, path, key, vars):
+        exists = self.ds.exists(path, **vars)
+        if exists and not self.outdated(path, key, vars):
+            return EXISTS, None
+        for recipe in self.recipes(path):
+            deps = []
+            for ingredient in recipe.ingredients:
+                state, step = self.visit(ingredient, vars)
+                if state == UNBUILDABLE:
+                    break
+                elif step is not None and step not in deps:
+                    deps.append(step)
+            else:
+                deps.extend(s for s in self.upstream.get(key, []) if s not in deps)
+                return BUILDABLE, self.add_step(Step(recipe, vars, deps, recheck=key in self.recheck))
+        return (EXISTS if exists else UNBUILDABLE), None
+
+    def outdated(self, path, key, vars):
+        if self.rebuild == "missing":
+            return False
+        real_path = self.ds.real_path(path, check_existing=False, **vars)
+        record = None if isinstance(real_path, list) else self.ds.manifests.read(real_path)
+        if record is None:
+            return False
+        upstream = []
+        for input_path in record["inputs"]:
+            try:
+                state, step = self.visit(input_path, {})
+            except KeyError:
+                continue
+            if step is not None:
+                upstream.append(step)
+        self.upstream[key] = upstream
+        if self.ds.is_stale(path, **vars):
+            return True
+        elif upstream:
+            self.recheck.add(key)
+            return True
+        return False
+
+    def add_step(self, step):
+        key = id(step.recipe), tuple(self.ds._format_path(d, step.vars) for d in step.recipe.dishes)
+        existing = self.steps.setdefault(key, step)
+        if existing is not step:
+            existing.recheck = existing.recheck and step.recheck
+            existing.deps.extend(d for d in step.deps if d not in existing.deps)
+        return existing
+
+    def needed(self, roots):
+        needed = set()
+        stack = [step for step in roots if step is not None]
+        while stack:
+            step = stack.pop()
+            if step not in needed:
+                needed.add(step)
+                stack.extend(step.deps)
+        return [step for step in self.steps.values() if step in needed]
+
+    def plan(self, path, **vars):
+        state, step = self.visit(path, vars)
+        target = self.ds._format_path(path, vars)
+        return Plan(target, state, self.needed([step]), dict(self.nodes))
+
+    def plan_all(self, path, variants):
+        states = {}
+        roots = []
+        for vars in variants:
+            state, step = self.visit(path, vars)
+            states[self.ds._format_path(path, vars)] = state
+            roots.append(step)
+        if all(s == EXISTS for s in states.values()):
+            state = EXISTS
+        elif any(s == UNBUILDABLE for s in states.values()):
+            state = UNBUILDABLE
+        else:
+            state = BUILDABLE
+        return Plan(list(states), state, self.needed(roots), dict(self.nodes))
@@ -0,0 +1,63 @@
+import operator
+
+import pandas as pd
+
+OPERATORS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+}
+
+
+def normalize(where):
+    if where is None:
+        return []
+    if isinstance(where, tuple) and len(where) == 3 and isinstance(where[0], str):
+        where = [where]
+    predicates = []
+    for field, op, value in where:
+        op = op.lower()
+        if op not in OPERATORS:
+            raise ValueError("Unsupported operator \"{}\" in predicate on {}".format(op, field))
+        if op in ("in", "not in"):
+            value = list(value)
+        predicates.append((field, op, value))
+    return predicates
+
+
+def fields_of(where):
+    fields = []
+    for field, _, _ in where:
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def split(where, fields):
+    fields = set(fields)
+    inside = [p for p in where if p[0] in fields]
+    outside = [p for p in where if p[0] not in fields]
+    return inside, outside
+
+
+def mask(data, where):
+    result = pd.Series(True, index=data.index)
+    for field, op, value in where:
+        result &= OPERATORS[op](data[field], value).fillna(False).astype(bool)
+    return result
+
+
+def apply(data, where):
+    if not where or not isinstance(data, pd.DataFrame):
+        return data
+    return data[mask(data, where)]
+
+
+def to_arrow(where):
+    return [(field, "==" if op == "=" else op, value) for field, op, value in where]
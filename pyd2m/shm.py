@@ -0,0 +1,332 @@
+import fcntl
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import uuid
+import weakref
+from contextlib import contextmanager
+from glob import glob
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .locks import HOST, pid_alive, read_owner
+from .store import DataStore, DSArrow, select_columns
+from . import predicates
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+ROOT = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "pyd2m-{}".format(os.getuid()))
+TRACK = "track" in inspect.signature(shared_memory.SharedMemory).parameters
+
+
+def open_segment(name, size=0, create=False):
+    if TRACK:
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    segment = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def destroy_segment(segment):
+    segment.close()
+    if not TRACK:
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+def unlink_segment(name):
+    try:
+        segment = open_segment(name)
+    except FileNotFoundError:
+        return
+    destroy_segment(segment)
+
+
+def close_segment(segment):
+    try:
+        segment.close()
+    except BufferError:
+        return False
+    return True
+
+
+def abandon_segment(segment):
+    # The mapping stays alive until the frames viewing it are collected.
+    segment._buf = segment._mmap = None
+
+
+def encode(data):
+    if isinstance(data, pd.DataFrame) and pyarrow is not None:
+        table = pyarrow.Table.from_pandas(data)
+        sink = pyarrow.MockOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        meta = {"kind": "table", "rows": table.num_rows}
+
+        def write(buf):
+            with pyarrow.ipc.new_stream(pyarrow.FixedSizeBufferWriter(pyarrow.py_buffer(buf)), table.schema) as w:
+                w.write_table(table)
+
+        return meta, sink.size(), write
+    if isinstance(data, np.ndarray) and not data.dtype.hasobject:
+        data = np.ascontiguousarray(data)
+        meta = {"kind": "array", "dtype": data.dtype.str, "shape": list(data.shape)}
+
+        def write(buf):
+            np.ndarray(data.shape, data.dtype, buffer=buf)[...] = data
+
+        return meta, data.nbytes, write
+    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write(buf):
+        buf[:len(payload)] = payload
+
+    return {"kind": "pickle"}, len(payload), write
+
+
+def read_table(buf, columns=None, where=None):
+    table = pyarrow.ipc.open_stream(pyarrow.py_buffer(buf)).read_all()
+    names = table.schema.names
+    if columns is not None:
+        index = (table.schema.pandas_metadata or {}).get("index_columns", [])
+        columns = select_columns(names, list(columns) + [c for c in index if isinstance(c, str)])
+    pushed = [p for p in where or [] if p[0] in names]
+    if pushed:
+        try:
+            expression = pq.filters_to_expression(predicates.to_arrow(pushed))
+            return pyarrow.dataset.dataset(table).to_table(columns=columns, filter=expression)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, pyarrow.ArrowTypeError, TypeError):
+            pass
+    return table if columns is None else table.select(columns)
+
+
+def decode(meta, buf, columns=None, where=None):
+    if meta["kind"] == "table":
+        return DSArrow.to_pandas(read_table(buf, columns, where))
+    if meta["kind"] == "array":
+        data = np.ndarray(meta["shape"], np.dtype(meta["dtype"]), buffer=buf)
+        data.flags.writeable = False
+        return data
+    return DataStore.project(pickle.loads(buf[:meta["size"]]), columns)
+
+
+def owner_alive(session_dir):
+    owner = read_owner(os.path.join(session_dir, "owner.json"))
+    if not isinstance(owner, dict) or owner.get("host") != HOST:
+        return True
+    return pid_alive(owner.get("pid"))
+
+
+def live_refs(session_dir, name):
+    refs = 0
+    for ref in glob(os.path.join(session_dir, "refs", "{}.*".format(name))):
+        if pid_alive(int(ref.rsplit(".", 1)[1])):
+            refs += 1
+        else:
+            os.remove(ref)
+    return refs
+
+
+def remove_session(session_dir):
+    for entry in glob(os.path.join(session_dir, "*.json")):
+        meta = read_owner(entry)
+        if isinstance(meta, dict) and "segment" in meta:
+            unlink_segment(meta["segment"])
+    for retired in glob(os.path.join(session_dir, "retired", "*")):
+        unlink_segment(os.path.basename(retired))
+    shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def sweep_sessions(root=ROOT):
+    for session_dir in glob(os.path.join(root, "*")):
+        if not owner_alive(session_dir):
+            remove_session(session_dir)
+
+
+def release(session_dir, attached, lingering, owner):
+    if os.getpid() != owner:
+        return
+    for name, segment in list(attached.items()) + list(lingering.items()):
+        if close_segment(segment):
+            try:
+                os.remove(os.path.join(session_dir, "refs", "{}.{}".format(name, owner)))
+            except OSError:
+                pass
+        else:
+            abandon_segment(segment)
+    attached.clear()
+    lingering.clear()
+
+
+def release_session(session_dir, attached, lingering, owner):
+    if os.getpid() != owner:
+        return
+    release(session_dir, attached, lingering, owner)
+    remove_session(session_dir)
+
+
+class DSSharedMemory(DataStore):
+    TYPE_TAG = "shared_memory"
+    PERSISTENT = False
+
+    def __init__(self, root=ROOT):
+        self.root = root
+        self.attached = {}
+        self.current = {}
+        self.session = None
+        self.finalizer = None
+        self.join(uuid.uuid4().hex[:12], owner=True)
+
+    def join(self, session, owner=False):
+        if self.finalizer is not None:
+            self.finalizer()
+        self.session = session
+        self.owner = owner
+        self.pid = os.getpid()
+        self.dir = os.path.join(self.root, session)
+        self.attached = {}
+        self.lingering = {}
+        self.current = {}
+        cleanup = release_session if owner else release
+        self.finalizer = weakref.finalize(self, cleanup, self.dir, self.attached, self.lingering, self.pid)
+
+    def ensure(self):
+        if not os.path.isdir(self.dir):
+            if self.owner:
+                sweep_sessions(self.root)
+            os.makedirs(os.path.join(self.dir, "refs"), exist_ok=True)
+            os.makedirs(os.path.join(self.dir, "retired"), exist_ok=True)
+            if self.owner:
+                with open(os.path.join(self.dir, "owner.json"), "w") as f:
+                    json.dump({"host": HOST, "pid": self.pid}, f)
+        return self.session
+
+    @contextmanager
+    def registry(self):
+        self.ensure()
+        with open(os.path.join(self.dir, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def entry(self, path):
+        return os.path.join(self.dir, hashlib.sha1(path.encode("utf-8")).hexdigest()[:20] + ".json")
+
+    def read_entry(self, path):
+        meta = read_owner(self.entry(path))
+        return meta if isinstance(meta, dict) else None
+
+    def retire(self, name):
+        marker = os.path.join(self.dir, "retired", name)
+        open(marker, "w").close()
+        self.sweep()
+
+    def sweep(self):
+        for name, segment in list(self.lingering.items()):
+            if close_segment(segment):
+                del self.lingering[name]
+                self.unref(name)
+        for marker in glob(os.path.join(self.dir, "retired", "*")):
+            name = os.path.basename(marker)
+            if not live_refs(self.dir, name):
+                unlink_segment(name)
+                os.remove(marker)
+
+    def ref(self, name):
+        return os.path.join(self.dir, "refs", "{}.{}".format(name, os.getpid()))
+
+    def unref(self, name):
+        try:
+            os.remove(self.ref(name))
+        except OSError:
+            pass
+
+    def detach(self, path):
+        name = self.current.pop(path, None)
+        if name is None:
+            return
+        segment = self.attached.pop(name)
+        if close_segment(segment):
+            self.unref(name)
+        else:
+            self.lingering[name] = segment
+
+    def attach(self, path):
+        with self.registry():
+            meta = self.read_entry(path)
+            if meta is None:
+                raise FileNotFoundError(path)
+            name = meta["segment"]
+            if self.current.get(path) != name:
+                self.detach(path)
+                if name not in self.attached:
+                    self.attached[name] = open_segment(name)
+                    open(self.ref(name), "w").close()
+                self.current[path] = name
+            if self.lingering:
+                self.sweep()
+            return meta, self.attached[name]
+
+    def dump(self, path, data, config):
+        meta, size, write = encode(data)
+        name = "d2m_{}_{}".format(self.session[:8], uuid.uuid4().hex[:12])
+        segment = open_segment(name, max(size, 1), create=True)
+        try:
+            write(segment.buf)
+        except BaseException:
+            destroy_segment(segment)
+            raise
+        segment.close()
+        meta.update(path=path, segment=name, size=size)
+        with self.registry():
+            old = self.read_entry(path)
+            tmp = "{}.{}.tmp".format(self.entry(path), uuid.uuid4().hex[:8])
+            with open(tmp, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp, self.entry(path))
+            if old is not None:
+                self.detach(path)
+                self.retire(old["segment"])
+
+    def load(self, path, config, columns=None, where=None):
+        meta, segment = self.attach(path)
+        return decode(meta, segment.buf, columns, where)
+
+    def exists(self, path):
+        return os.path.exists(self.entry(path))
+
+    def delete(self, path):
+        with self.registry():
+            old = self.read_entry(path)
+            if old is not None:
+                os.remove(self.entry(path))
+                self.detach(path)
+                self.retire(old["segment"])
+
+    def fingerprint(self, path, method="mtime"):
+        return None
+
+    def num_rows(self, path, config=None):
+        meta = self.read_entry(path)
+        return None if meta is None else meta.get("rows")
+
+    def segments(self):
+        entries = [read_owner(p) for p in glob(os.path.join(self.dir, "*.json")) if not p.endswith("owner.json")]
+        return {e["path"]: (e["segment"], e["size"]) for e in entries if isinstance(e, dict)}
+
+    def close(self):
+        self.finalizer()
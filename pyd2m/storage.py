@@ -0,0 +1,177 @@
+import hashlib
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fsspec
+except ImportError:
+    fsspec = None
+
+CACHE_DIR = os.path.join("~", ".cache", "pyd2m")
+RANGE_SIZE = 8 << 20
+RANGE_WORKERS = 8
+
+filesystems = {}
+
+
+def register_filesystem(protocol, fs):
+    filesystems[protocol] = fs
+    return fs
+
+
+def is_url(path):
+    return isinstance(path, str) and "://" in path and not path.startswith("file://")
+
+
+def split_url(url):
+    protocol, root = url.split("://", 1)
+    return protocol, root.rstrip("/")
+
+
+def get_filesystem(protocol):
+    if protocol in filesystems:
+        return filesystems[protocol]
+    if fsspec is None:
+        raise ImportError("fsspec is required for {}:// data paths".format(protocol))
+    return fsspec.filesystem(protocol)
+
+
+def version_of(info):
+    for key in ("ETag", "etag", "md5", "mtime", "LastModified", "last_modified", "updated"):
+        if info.get(key) is not None:
+            return key, str(info[key])
+    return None, None
+
+
+def object_key(remote, info):
+    key, version = version_of(info)
+    if key in ("ETag", "etag", "md5"):
+        token = "{}:{}".format(version.strip('"'), info["size"])
+    else:
+        token = "{}:{}:{}".format(remote, version, info["size"])
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()
+
+
+class Storage:
+    def __init__(self, url, cache_dir=None, range_size=RANGE_SIZE, range_workers=RANGE_WORKERS):
+        self.url = url
+        protocol, self.root = split_url(url)
+        self.fs = get_filesystem(protocol)
+        self.cache_dir = os.path.realpath(os.path.expanduser(cache_dir or CACHE_DIR))
+        self.local_root = os.path.join(self.cache_dir, "roots", hashlib.sha1(url.encode("utf-8")).hexdigest()[:16])
+        self.objects = os.path.join(self.cache_dir, "objects")
+        self.range_size = range_size
+        self.range_workers = range_workers
+        self.versions = {}
+        os.makedirs(self.local_root, exist_ok=True)
+
+    def remote(self, real_path):
+        rel = os.path.relpath(real_path, self.local_root)
+        return self.root if rel == "." else "{}/{}".format(self.root, rel.replace(os.sep, "/"))
+
+    def local(self, remote):
+        remote = remote.strip("/")
+        return os.path.join(self.local_root, *remote[len(self.root.strip("/")):].strip("/").split("/"))
+
+    def object_path(self, key):
+        return os.path.join(self.objects, key[:2], key[2:])
+
+    def exists(self, real_path):
+        return self.fs.exists(self.remote(real_path))
+
+    def glob(self, pattern):
+        return [self.local(p) for p in self.fs.glob(self.remote(pattern))]
+
+    def fetch(self, real_path):
+        remote = self.remote(real_path)
+        try:
+            info = self.fs.info(remote)
+        except FileNotFoundError:
+            self.forget(real_path)
+            return False
+        if info.get("type") == "directory":
+            for path in self.fs.find(remote):
+                self.fetch_file(path, self.local(path))
+        else:
+            self.fetch_file(remote, real_path, info)
+        return True
+
+    def fetch_file(self, remote, local, info=None):
+        info = info or self.fs.info(remote)
+        key = object_key(remote, info)
+        if self.versions.get(local) == key and os.path.exists(local):
+            return
+        obj = self.object_path(key)
+        if not os.path.exists(obj):
+            self.download(remote, obj, info["size"])
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        tmp = "{}.{}.part".format(local, uuid.uuid4().hex[:8])
+        shutil.copyfile(obj, tmp)
+        os.replace(tmp, local)
+        self.versions[local] = key
+
+    def download(self, remote, obj, size):
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = "{}.{}.part".format(obj, uuid.uuid4().hex[:8])
+        try:
+            if size <= self.range_size:
+                with open(tmp, "wb") as f:
+                    f.write(self.fs.cat_file(remote))
+            else:
+                with open(tmp, "wb") as f:
+                    f.truncate(size)
+
+                def read_range(start):
+                    data = self.fs.cat_file(remote, start, min(start + self.range_size, size))
+                    with open(tmp, "r+b") as f:
+                        f.seek(start)
+                        f.write(data)
+
+                with ThreadPoolExecutor(self.range_workers) as pool:
+                    list(pool.map(read_range, range(0, size, self.range_size)))
+            os.replace(tmp, obj)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def push(self, real_path):
+        remote = self.remote(real_path)
+        if os.path.isdir(real_path):
+            files = [os.path.join(root, f) for root, _, fs in os.walk(real_path) for f in fs]
+            stale = set(self.fs.find(remote)) if self.fs.exists(remote) else set()
+            for path in files:
+                self.push_file(path)
+                stale.discard(self.remote(path).strip("/"))
+            for path in stale:
+                self.fs.rm(path)
+        else:
+            self.push_file(real_path)
+
+    def push_file(self, local):
+        remote = self.remote(local)
+        self.fs.put_file(local, remote)
+        key = object_key(remote, self.fs.info(remote))
+        obj = self.object_path(key)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp = "{}.{}.part".format(obj, uuid.uuid4().hex[:8])
+            shutil.copyfile(local, tmp)
+            os.replace(tmp, obj)
+        self.versions[local] = key
+
+    def remove(self, real_path):
+        remote = self.remote(real_path)
+        if self.fs.exists(remote):
+            self.fs.rm(remote, recursive=True)
+        self.forget(real_path)
+
+    def forget(self, real_path):
+        prefix = real_path.rstrip(os.sep) + os.sep
+        for local in [p for p in self.versions if p == real_path or p.startswith(prefix)]:
+            del self.versions[local]
+
+    def __repr__(self):
+        return "<Storage {} cached in {}>".format(self.url, self.local_root)
@@ -1,33 +1,125 @@
+import itertools
 import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from glob import glob
 
 import pandas as pd
 import numpy as np
 import msgpack
 import pickle
 
+from .manifest import file_fingerprint
+from . import predicates
+
+
+def select_columns(names, columns):
+    names = set(names)
+    return [c for c in columns if c in names]
+
+
+def temp_path(path):
+    head, tail = os.path.split(path)
+    stem, ext = os.path.splitext(tail)
+    return os.path.join(head, ".{}.{}.tmp{}".format(stem, uuid.uuid4().hex[:8], ext))
+
+
+def remove_temp_files(path):
+    head, tail = os.path.split(path)
+    stem, ext = os.path.splitext(tail)
+    for tmp in glob(os.path.join(head, ".{}.*.tmp{}".format(stem, ext))):
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+def replace(src, dst):
+    if os.path.isdir(dst):
+        old = temp_path(dst)
+        os.rename(dst, old)
+        os.rename(src, dst)
+        shutil.rmtree(old)
+    else:
+        os.replace(src, dst)
+
 
 class DataStore:
     TYPE_TAG = None
+    PERSISTENT = True
+
+    @contextmanager
+    def atomic(self, path):
+        if not self.PERSISTENT:
+            yield path
+            return
+        tmp = temp_path(path)
+        try:
+            yield tmp
+            replace(tmp, path)
+        except BaseException:
+            self.delete(tmp)
+            raise
 
     def dump(self, path, data, config):
         raise NotImplementedError
 
-    def load(self, path, config):
+    def load(self, path, config, columns=None, where=None):
         raise NotImplementedError
 
+    def iter_load(self, path, config, chunksize, columns=None, where=None):
+        data = self.load(path, config, columns=columns, where=where)
+        for start in range(0, len(data), chunksize):
+            if isinstance(data, (pd.DataFrame, pd.Series)):
+                yield data.iloc[start:start + chunksize]
+            else:
+                yield data[start:start + chunksize]
+
+    def append(self, path, data, config):
+        raise NotImplementedError
+
+    def dump_iter(self, path, chunks, config):
+        chunks = list(chunks)
+        if chunks and all(isinstance(c, pd.DataFrame) for c in chunks):
+            self.dump(path, pd.concat(chunks, ignore_index=True), config)
+        else:
+            self.dump(path, [item for chunk in chunks for item in chunk], config)
+
+    @staticmethod
+    def project(data, columns):
+        if columns is None or not isinstance(data, pd.DataFrame):
+            return data
+        return data[select_columns(data.columns, columns)]
+
     def exists(self, path):
         return os.path.exists(path)
 
+    def write_partitions(self, path, chunks, config, mode="w"):
+        raise NotImplementedError("{} does not support PARTITION_BY".format(self))
+
     def delete(self, path):
-        if os.path.exists(path):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
             os.remove(path)
 
+    def fingerprint(self, path, method="mtime"):
+        return file_fingerprint(path, method)
+
+    def num_rows(self, path, config=None):
+        return None
+
     def __repr__(self):
         return "[DataStore({})]".format(self.TYPE_TAG)
 
 
 class DSMemory(DataStore):
     TYPE_TAG = "memory"
+    PERSISTENT = False
 
     def __init__(self):
         self.cache = {}
@@ -35,8 +127,8 @@ class DSMemory(DataStore):
     def dump(self, path, data, config):
         self.cache[path] = data
 
-    def load(self, path, config):
-        return self.cache[path]
+    def load(self, path, config, columns=None, where=None):
+        return self.project(self.cache[path], columns)
 
     def exists(self, path):
         return path in self.cache
@@ -45,32 +137,267 @@ class DSMemory(DataStore):
         if path in self.cache:
             del self.cache[path]
 
+    def fingerprint(self, path, method="mtime"):
+        return None
+
 
 try:
     import feather
 except ImportError:
     pass
 
+try:
+    import pyarrow
+    import pyarrow.dataset
+    import pyarrow.feather
+    import pyarrow.parquet as pq
+    import pyarrow.ipc
+
+    ARROW_ERRORS = (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, pyarrow.ArrowTypeError, TypeError)
+except ImportError:
+    pq = None
+
+
+def filter_table(source, names, columns, where, format):
+    if columns is not None:
+        columns = select_columns(names, columns)
+    pushed = [p for p in where or [] if p[0] in names]
+    if pushed:
+        try:
+            dataset = pyarrow.dataset.dataset(source, format=format)
+            expression = pq.filters_to_expression(predicates.to_arrow(pushed))
+            return dataset.to_table(columns=columns, filter=expression)
+        except ARROW_ERRORS:
+            pass
+    return None
+
+
+def partition_by(config):
+    fields = getattr(config, "PARTITION_BY", None) if config is not None else None
+    if isinstance(fields, str):
+        return [fields]
+    return list(fields or [])
+
+
+def partition_type(kind):
+    try:
+        return pyarrow.from_numpy_dtype(np.dtype(kind))
+    except (TypeError, pyarrow.ArrowNotImplementedError):
+        return pyarrow.string()
+
+
+class PartitionedStore(DataStore):
+    FORMAT = None
+    EXTENSION = None
+
+    def partitioning(self, config):
+        fields = partition_by(config)
+        schema = pyarrow.schema([(f, partition_type(config.fields.get(f, "str"))) for f in fields])
+        return pyarrow.dataset.partitioning(schema, flavor="hive")
+
+    def write_partitions(self, path, chunks, config, mode="w"):
+        if mode == "w" and os.path.exists(path):
+            self.delete(path)
+        os.makedirs(path, exist_ok=True)
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            return
+        schema = pyarrow.Schema.from_pandas(first, preserve_index=False)
+        batches = (pyarrow.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+                   for chunk in itertools.chain([first], chunks))
+        prefix = "part-{}-".format(uuid.uuid4().hex) if mode == "a" else "part-"
+        pyarrow.dataset.write_dataset(batches, path, schema=schema, format=self.FORMAT,
+                                      partitioning=partition_by(config), partitioning_flavor="hive",
+                                      basename_template=prefix + "{i}." + self.EXTENSION,
+                                      existing_data_behavior="delete_matching" if mode == "r" else "overwrite_or_ignore")
+
+    def read_partitions(self, path, config, columns=None, where=None):
+        dataset = pyarrow.dataset.dataset(path, format=self.FORMAT, partitioning=self.partitioning(config))
+        names = dataset.schema.names
+        if columns is not None:
+            columns = select_columns(names, columns)
+        pushed = [p for p in where or [] if p[0] in names]
+        if pushed:
+            try:
+                return dataset.to_table(columns=columns, filter=pq.filters_to_expression(predicates.to_arrow(pushed)))
+            except ARROW_ERRORS:
+                pass
+        return dataset.to_table(columns=columns)
+
+    def iter_partitions(self, path, config, chunksize, columns=None, where=None):
+        for batch in self.read_partitions(path, config, columns, where).to_batches(max_chunksize=chunksize):
+            yield pyarrow.Table.from_batches([batch])
+
+    def num_partition_rows(self, path, config):
+        return pyarrow.dataset.dataset(path, format=self.FORMAT, partitioning=self.partitioning(config)).count_rows()
+
 
 class DSFeather(DataStore):
     TYPE_TAG = "feather"
 
     def dump(self, path, data, config):
-        data.reset_index(drop=True, inplace=True)
-        data.to_feather(path)
-
-    def load(self, path, config):
-        return feather.read_dataframe(path)
+        if pq is None:
+            return feather.write_dataframe(data.reset_index(drop=True), path)
+        pyarrow.feather.write_feather(data.reset_index(drop=True), path)
+
+    def load(self, path, config, columns=None, where=None):
+        if pq is None:
+            return feather.read_dataframe(path, columns=columns)
+        names = pyarrow.ipc.open_file(path).schema.names
+        table = filter_table(path, names, columns, where, "feather")
+        if table is not None:
+            return table.to_pandas()
+        if columns is not None:
+            columns = select_columns(names, columns)
+        return pyarrow.feather.read_table(path, columns=columns).to_pandas()
+
+    def num_rows(self, path, config=None):
+        if pq is None:
+            return None
+        with pyarrow.memory_map(path) as source:
+            reader = pyarrow.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+class DSArrow(PartitionedStore):
+    TYPE_TAG = "arrow"
+    FORMAT = "ipc"
+    EXTENSION = "arrow"
 
-
-class DSParquet(DataStore):
+    def dump(self, path, data, config):
+        if partition_by(config):
+            return self.write_partitions(path, [data], config)
+        table = pyarrow.Table.from_pandas(data, preserve_index=False)
+        with pyarrow.OSFile(path, "wb") as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def dump_iter(self, path, chunks, config):
+        if partition_by(config):
+            return self.write_partitions(path, chunks, config)
+        writer = None
+        with pyarrow.OSFile(path, "wb") as sink:
+            try:
+                for chunk in chunks:
+                    if writer is None:
+                        table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                        writer = pyarrow.ipc.new_file(sink, table.schema)
+                    else:
+                        table = pyarrow.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    @staticmethod
+    def to_pandas(table):
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def read_table(self, path, columns=None, where=None):
+        reader = pyarrow.ipc.open_file(pyarrow.memory_map(path))
+        names = reader.schema.names
+        table = filter_table(path, names, columns, where, "arrow")
+        if table is None:
+            table = reader.read_all()
+            if columns is not None:
+                table = table.select(select_columns(names, columns))
+        return table
+
+    def load(self, path, config, columns=None, where=None):
+        if partition_by(config):
+            return self.to_pandas(self.read_partitions(path, config, columns, where))
+        return self.to_pandas(self.read_table(path, columns, where))
+
+    def iter_load(self, path, config, chunksize, columns=None, where=None):
+        if partition_by(config):
+            for table in self.iter_partitions(path, config, chunksize, columns, where):
+                yield self.to_pandas(table)
+            return
+        table = self.read_table(path, columns, where)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield self.to_pandas(pyarrow.Table.from_batches([batch]))
+
+    def append(self, path, data, config):
+        if not partition_by(config):
+            raise NotImplementedError
+        self.write_partitions(path, [data], config, mode="a")
+
+    def num_rows(self, path, config=None):
+        if partition_by(config):
+            return self.num_partition_rows(path, config)
+        with pyarrow.memory_map(path) as source:
+            return pyarrow.ipc.open_file(source).read_all().num_rows
+
+
+class DSParquet(PartitionedStore):
     TYPE_TAG = "parquet"
+    FORMAT = "parquet"
+    EXTENSION = "parquet"
 
     def dump(self, path, data, config):
+        if partition_by(config):
+            return self.write_partitions(path, [data], config)
         data.to_parquet(path)
 
-    def load(self, path, config):
-        return pd.read_parquet(path)
+    def load(self, path, config, columns=None, where=None):
+        if partition_by(config):
+            return self.read_partitions(path, config, columns, where).to_pandas()
+        if pq is None:
+            return pd.read_parquet(path, columns=columns)
+        names = pq.read_schema(path).names
+        if columns is not None:
+            columns = select_columns(names, columns)
+        pushed = [p for p in where or [] if p[0] in names]
+        if pushed:
+            try:
+                return pd.read_parquet(path, columns=columns, filters=predicates.to_arrow(pushed))
+            except ARROW_ERRORS:
+                pass
+        return pd.read_parquet(path, columns=columns)
+
+    def num_rows(self, path, config=None):
+        if pq is None:
+            return None
+        if partition_by(config):
+            return self.num_partition_rows(path, config)
+        return pq.ParquetFile(path).metadata.num_rows
+
+    def append(self, path, data, config):
+        if not partition_by(config):
+            raise NotImplementedError
+        self.write_partitions(path, [data], config, mode="a")
+
+    def iter_load(self, path, config, chunksize, columns=None, where=None):
+        if partition_by(config):
+            for table in self.iter_partitions(path, config, chunksize, columns, where):
+                yield table.to_pandas()
+            return
+        if pq is None:
+            yield from super().iter_load(path, config, chunksize, columns=columns, where=where)
+            return
+        source = pq.ParquetFile(path)
+        if columns is not None:
+            columns = select_columns(source.schema_arrow.names, columns)
+        for batch in source.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+    def dump_iter(self, path, chunks, config):
+        if partition_by(config):
+            return self.write_partitions(path, chunks, config)
+        if pq is None:
+            return super().dump_iter(path, chunks, config)
+        writer = None
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    table = pyarrow.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
 
 
 class DSCsv(DataStore):
@@ -80,9 +407,16 @@ class DSCsv(DataStore):
         csv_kwargs = {k: eval(v) if isinstance(v, str) else v for k, v in getattr(config, "CSV_DUMP_ARG", {}).items()}
         data.to_csv(path, **csv_kwargs)
 
-    def load(self, path, config):
+    @staticmethod
+    def load_kwargs(config, columns):
         kwargs = {k: eval(v) if isinstance(v, str) else v for k, v in getattr(config, "CSV_LOAD_ARG", {}).items()}
-        df = pd.read_csv(path, **kwargs)
+        if columns is not None and kwargs.get("header", True) is not None \
+                and "usecols" not in kwargs and "index_col" not in kwargs:
+            wanted = set(columns)
+            kwargs["usecols"] = lambda c: c in wanted
+        return kwargs
+
+    def rename(self, df, config, kwargs, columns):
         if kwargs.get("header", True) is None:
             fields = {idx: f for idx, f in
                       enumerate([k for k in config.fields.keys() if k not in getattr(config, "CSV_EXCLUDE", [])])}
@@ -90,7 +424,29 @@ class DSCsv(DataStore):
                 df.index.name = fields[0]
                 fields = fields[1:]
             df.rename(columns=fields, inplace=True)
-        return df
+        return self.project(df, columns)
+
+    def load(self, path, config, columns=None, where=None):
+        kwargs = self.load_kwargs(config, columns)
+        return self.rename(pd.read_csv(path, **kwargs), config, kwargs, columns)
+
+    def iter_load(self, path, config, chunksize, columns=None, where=None):
+        kwargs = self.load_kwargs(config, columns)
+        with pd.read_csv(path, chunksize=chunksize, **kwargs) as reader:
+            for df in reader:
+                yield self.rename(df, config, kwargs, columns)
+
+    def dump_iter(self, path, chunks, config, mode="w"):
+        csv_kwargs = {k: eval(v) if isinstance(v, str) else v for k, v in getattr(config, "CSV_DUMP_ARG", {}).items()}
+        header = csv_kwargs.pop("header", True)
+        if mode == "a" and os.path.exists(path) and os.path.getsize(path):
+            header = False
+        with open(path, mode, newline="") as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, header=header if i == 0 else False, **csv_kwargs)
+
+    def append(self, path, data, config):
+        self.dump_iter(path, [data], config, mode="a")
 
 
 class DSNumpy(DataStore):
@@ -99,7 +455,7 @@ class DSNumpy(DataStore):
     def dump(self, path, data, config):
         np.save(path, data)
 
-    def load(self, path, config):
+    def load(self, path, config, columns=None, where=None):
         return np.load(path)
 
 
@@ -110,10 +466,10 @@ class DSPickle(DataStore):
         with open(path, "wb") as f:
             pickle.dump(data, f)
 
-    def load(self, path, config):
+    def load(self, path, config, columns=None, where=None):
         with open(path, "rb") as f:
             data = pickle.load(f)
-        return data
+        return self.project(data, columns)
 
 import json
 
@@ -124,7 +480,7 @@ class DSJSON(DataStore):
         with open(path, "w") as f:
             json.dump(data, f)
 
-    def load(self, path, config):
+    def load(self, path, config, columns=None, where=None):
         with open(path, "r") as f:
             data = json.load(f)
         return data
@@ -136,7 +492,7 @@ class DSStrList(DataStore):
         with open(path, "w") as f:
             f.write("\n".join(data))
 
-    def load(self, path, config):
+    def load(self, path, config, columns=None, where=None):
         data = []
         with open(path, "r") as f:
             for line in f:
@@ -145,37 +501,203 @@ class DSStrList(DataStore):
                     data.append(line)
         return data
 
-class DSMsgpackStream(DataStore):
-    TYPE_TAG = "msgpack_stream"
+def msgpack_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    elif isinstance(obj, (pd.Timestamp, pd.Timedelta)):
+        return str(obj)
+    elif obj is pd.NaT:
+        return None
+    raise TypeError("Cannot serialize {!r}".format(obj))
 
-    def dump(self, path, data, config):
+
+COLUMNAR_FORMAT = "pyd2m.columnar"
+
+
+def columnar_header(columns):
+    return {"format": COLUMNAR_FORMAT, "version": 1, "columns": list(columns)}
+
+
+def is_columnar_header(header):
+    return isinstance(header, dict) and header.get("format") == COLUMNAR_FORMAT
+
+
+def encode_column(series, raw=True):
+    values = series.to_numpy()
+    if values.dtype.kind in "biufcmM":
+        values = np.ascontiguousarray(values)
+        if raw:
+            return {"dtype": values.dtype.str, "buf": values.tobytes()}
+        return values
+    return values.tolist() if raw else values
+
+
+def decode_column(value):
+    if isinstance(value, dict):
+        return np.frombuffer(value["buf"], dtype=np.dtype(value["dtype"]))
+    elif isinstance(value, np.ndarray):
+        return value
+    values = np.empty(len(value), dtype=object)
+    values[:] = value
+    return values
+
+
+def iter_batches(data, batch_size):
+    for start in range(0, len(data), batch_size):
+        yield data.iloc[start:start + batch_size]
+
+
+def concat_columns(columns, batches):
+    if not batches:
+        return pd.DataFrame(columns=columns)
+    arrays = {}
+    for i, c in enumerate(columns):
+        parts = [b[i] for b in batches]
+        arrays[c] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    return pd.DataFrame(arrays, columns=columns, copy=len(batches) == 1)
+
+
+class ColumnarStream(DataStore):
+    BATCH_SIZE = 65536
+
+    def batch_size(self, config):
+        return getattr(config, "batch_size", self.BATCH_SIZE) if config is not None else self.BATCH_SIZE
+
+    def open_reader(self, f):
+        raise NotImplementedError
+
+    def write_header(self, f, columns):
+        raise NotImplementedError
+
+    def write_batch(self, f, columns, batch):
+        raise NotImplementedError
+
+    def decode_batch(self, item):
+        raise NotImplementedError
+
+    def legacy(self, header, reader, columns):
         raise NotImplementedError
 
-    def load(self, path, config):
+    def read_header(self, path):
         with open(path, "rb") as f:
-            unpacker = msgpack.Unpacker(f)
-            columns = unpacker.unpack()
-            data = []
-            try:
-                for item in unpacker:
-                    data.append(item)
-            except msgpack.OutOfData:
-                pass
-        return pd.DataFrame(data, columns=columns)
+            return next(self.open_reader(f), None)
+
+    def dump(self, path, data, config):
+        self.dump_iter(path, [data], config)
+
+    def dump_iter(self, path, chunks, config, mode="wb"):
+        batch_size = self.batch_size(config)
+        header = self.read_header(path) if mode == "ab" and os.path.exists(path) else None
+        if header is not None and not is_columnar_header(header):
+            raise ValueError("Cannot append to {}: not a {} stream".format(path, COLUMNAR_FORMAT))
+        columns = None if header is None else header["columns"]
+        with open(path, mode) as f:
+            for chunk in chunks:
+                if columns is None:
+                    columns = chunk.columns.tolist()
+                    self.write_header(f, columns)
+                for batch in iter_batches(chunk[columns], batch_size):
+                    self.write_batch(f, columns, batch)
+            if columns is None:
+                self.write_header(f, [])
+
+    def append(self, path, data, config):
+        self.dump_iter(path, [data], config, mode="ab")
+
+    def iter_columnar(self, path):
+        with open(path, "rb") as f:
+            reader = self.open_reader(f)
+            header = next(reader, None)
+            yield header
+            if is_columnar_header(header):
+                for item in reader:
+                    yield self.decode_batch(item)
+            else:
+                yield reader
+
+    def load(self, path, config, columns=None, where=None):
+        items = self.iter_columnar(path)
+        header = next(items)
+        if header is None:
+            return pd.DataFrame(columns=columns)
+        if not is_columnar_header(header):
+            return self.legacy(header, next(items), columns)
+        return self.project(concat_columns(header["columns"], list(items)), columns)
+
+    def iter_load(self, path, config, chunksize, columns=None, where=None):
+        items = self.iter_columnar(path)
+        header = next(items)
+        if header is None:
+            return
+        if not is_columnar_header(header):
+            yield from self.legacy_iter(header, next(items), chunksize, columns)
+            return
+        buffer = None
+        for batch in items:
+            data = self.project(concat_columns(header["columns"], [batch]), columns)
+            buffer = data if buffer is None else pd.concat([buffer, data], ignore_index=True)
+            while len(buffer) >= chunksize:
+                yield buffer.iloc[:chunksize]
+                buffer = buffer.iloc[chunksize:]
+        if buffer is not None and len(buffer):
+            yield buffer
+
+    def legacy_iter(self, header, reader, chunksize, columns):
+        data = self.legacy(header, reader, columns)
+        for start in range(0, len(data), chunksize):
+            yield data.iloc[start:start + chunksize]
+
+
+class DSMsgpackStream(ColumnarStream):
+    TYPE_TAG = "msgpack_stream"
+
+    def open_reader(self, f):
+        return iter(msgpack.Unpacker(f, raw=False, strict_map_key=False, max_buffer_size=0))
+
+    def write_header(self, f, columns):
+        f.write(msgpack.packb(columnar_header(columns), default=msgpack_default))
+
+    def write_batch(self, f, columns, batch):
+        f.write(msgpack.packb([encode_column(batch[c]) for c in columns], default=msgpack_default))
+
+    def decode_batch(self, item):
+        return [decode_column(c) for c in item]
 
+    def legacy(self, header, reader, columns):
+        return self.project(pd.DataFrame(list(reader), columns=header), columns)
 
-class PickleStream(DataStore):
+
+class PickleStream(ColumnarStream):
     TYPE_TAG = "pickle_stream"
 
-    def dump(self, path, data, config):
-        raise NotImplementedError
+    def open_reader(self, f):
+        try:
+            while True:
+                yield pickle.load(f)
+        except EOFError:
+            pass
+
+    def write_header(self, f, columns):
+        pickle.dump(columnar_header(columns), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write_batch(self, f, columns, batch):
+        pickle.dump([encode_column(batch[c], raw=False) for c in columns], f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode_batch(self, item):
+        return [decode_column(c) for c in item]
 
-    def load(self, path, config):
+    def legacy(self, header, reader, columns):
+        return [header] + list(reader)
+
+    def legacy_iter(self, header, reader, chunksize, columns):
         data = []
-        with open(path, "rb") as f:
-            try:
-                while True:
-                    data.append(pickle.load(f))
-            except EOFError:
-                pass
-        return data
+        for item in itertools.chain([header], reader):
+            if isinstance(item, pd.DataFrame):
+                yield self.project(item, columns)
+                continue
+            data.append(item)
+            if len(data) >= chunksize:
+                yield data
+                data = []
+        if data:
+            yield data
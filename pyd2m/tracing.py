@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+import pandas as pd
+
+current_span = ContextVar("current_span", default=None)
+
+
+def measure(data):
+    if isinstance(data, pd.DataFrame):
+        return {"rows": len(data), "bytes": int(data.memory_usage(index=False, deep=False).sum())}
+    elif isinstance(data, (list, tuple, pd.Series)):
+        return {"rows": len(data)}
+    return {}
+
+
+def file_size(path):
+    try:
+        if os.path.isdir(path):
+            return sum(os.path.getsize(os.path.join(root, f)) for root, _, fs in os.walk(path) for f in fs)
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+class Span:
+    __slots__ = ("tracer", "category", "name", "args", "start", "end", "parent", "children", "pid", "tid", "token")
+
+    def __init__(self, tracer, category, name, args):
+        self.tracer = tracer
+        self.category = category
+        self.name = name
+        self.args = args
+        self.children = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def measure(self, data):
+        self.args.update(measure(data))
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        return self.duration - self.children
+
+    def __enter__(self):
+        self.parent = current_span.get()
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.token = current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end = time.perf_counter()
+        current_span.reset(self.token)
+        if self.parent is not None and self.parent.tid == self.tid:
+            self.parent.children += self.duration
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.emit(self)
+
+    def __repr__(self):
+        args = " ".join("{}={}".format(k, v) for k, v in self.args.items())
+        return "{} {} {:.2f} ms{}".format(self.category, self.name, self.duration * 1000, " " + args if args else "")
+
+
+class NoSpan:
+    def set(self, **args):
+        pass
+
+    def measure(self, data):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NO_SPAN = NoSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.sinks = []
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.sinks)
+
+    def add_sink(self, sink):
+        with self.lock:
+            self.sinks = self.sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink):
+        with self.lock:
+            self.sinks = [s for s in self.sinks if s is not sink]
+
+    def span(self, category, name, **args):
+        if not self.sinks:
+            return NO_SPAN
+        return Span(self, category, name, args)
+
+    def emit(self, span):
+        for sink in self.sinks:
+            sink(span)
+
+
+class LoggingSink:
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger("pyd2m")
+        self.level = level
+
+    def __call__(self, span):
+        self.logger.log(self.level, "%r", span)
+
+
+class TraceRecorder:
+    def __init__(self):
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def to_chrome_trace(self):
+        events = []
+        for span in self.spans:
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": span.args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+
+    def hotspots(self):
+        table = {}
+        for span in self.spans:
+            entry = table.setdefault((span.category, span.name), {"calls": 0, "total": 0.0, "self": 0.0, "rows": 0})
+            entry["calls"] += 1
+            entry["total"] += span.duration
+            entry["self"] += span.self_time
+            entry["rows"] += span.args.get("rows") or 0
+        df = pd.DataFrame([dict(category=c, name=n, **v) for (c, n), v in table.items()],
+                          columns=["category", "name", "calls", "total", "self", "rows"])
+        return df.sort_values("self", ascending=False, ignore_index=True)
+
+    def show(self, top=20):
+        df = self.hotspots().head(top)
+        print("{:<8} {:<50} {:>6} {:>10} {:>10} {:>10}".format("kind", "path/recipe", "calls", "total ms",
+                                                             "self ms", "rows"))
+        for row in df.itertuples(index=False):
+            print("{:<8} {:<50} {:>6} {:>10.1f} {:>10.1f} {:>10}".format(row.category, str(row.name)[-50:], row.calls,
+                                                                       row.total * 1000, row.self * 1000, row.rows))
@@ -0,0 +1,39 @@
+import os
+import textwrap
+
+import pytest
+
+from pyd2m import storage
+from pyd2m.cookbook import cookbook
+
+from .memfs import MemoryFileSystem
+
+
+@pytest.fixture(autouse=True)
+def fresh_cookbook():
+    cookbook.menu.clear()
+    yield
+    cookbook.menu.clear()
+
+
+@pytest.fixture
+def fs(monkeypatch):
+    fs = MemoryFileSystem()
+    monkeypatch.setitem(storage.filesystems, "mem", fs)
+    return fs
+
+
+@pytest.fixture
+def make_dataset(tmp_path):
+    def make(rc, cb="", files=None, name="dataset"):
+        base = tmp_path / name
+        os.makedirs(base / "conf", exist_ok=True)
+        (base / "conf" / "d2m.rc").write_text(textwrap.dedent(rc))
+        if cb:
+            (base / "conf" / "test.cb").write_text(textwrap.dedent(cb))
+        for path, content in (files or {}).items():
+            os.makedirs((base / path).parent, exist_ok=True)
+            (base / path).write_text(textwrap.dedent(content))
+        return str(base)
+
+    return make
@@ -0,0 +1,69 @@
+import re
+import threading
+import time
+
+
+def glob_regex(pattern):
+    parts = re.split(r"(\*\*|\*|\?)", pattern)
+    table = {"**": ".*", "*": "[^/]*", "?": "[^/]"}
+    return re.compile("".join(table.get(p, re.escape(p)) for p in parts) + "$")
+
+
+class MemoryFileSystem:
+    def __init__(self):
+        self.files = {}
+        self.lock = threading.Lock()
+        self.reads = 0
+
+    @staticmethod
+    def norm(path):
+        return path.strip("/")
+
+    def isdir(self, path):
+        prefix = self.norm(path) + "/"
+        return any(k.startswith(prefix) for k in self.files)
+
+    def exists(self, path):
+        return self.norm(path) in self.files or self.isdir(path)
+
+    def info(self, path):
+        path = self.norm(path)
+        if path in self.files:
+            data, mtime = self.files[path]
+            return {"name": path, "size": len(data), "type": "file", "mtime": mtime}
+        elif self.isdir(path):
+            return {"name": path, "size": 0, "type": "directory"}
+        raise FileNotFoundError(path)
+
+    def find(self, path):
+        path = self.norm(path)
+        return sorted(k for k in self.files if k == path or k.startswith(path + "/"))
+
+    def glob(self, pattern):
+        regex = glob_regex(self.norm(pattern))
+        names = set(self.files)
+        for k in self.files:
+            parts = k.split("/")
+            names.update("/".join(parts[:i]) for i in range(1, len(parts)))
+        return sorted(k for k in names if regex.match(k))
+
+    def cat_file(self, path, start=None, end=None):
+        with self.lock:
+            self.reads += 1
+        return self.files[self.norm(path)][0][start:end]
+
+    def pipe_file(self, path, value):
+        with self.lock:
+            self.files[self.norm(path)] = bytes(value), time.time_ns()
+
+    def put_file(self, lpath, rpath):
+        with open(lpath, "rb") as f:
+            self.pipe_file(rpath, f.read())
+
+    def rm(self, path, recursive=False):
+        with self.lock:
+            for k in self.find(path) if recursive else [self.norm(path)]:
+                self.files.pop(k, None)
+
+    def makedirs(self, path, exist_ok=True):
+        pass
@@ -0,0 +1,19 @@
+import os
+
+from pyd2m import DataSource
+
+from .test_planner import CB, RC
+
+
+def test_removed_output_is_rebuilt(make_dataset):
+    base = make_dataset(RC, CB, {"raw/b.csv": "X\n1\n2\n"})
+    ds = DataSource(base, silent=True)
+    ds.generate("out/d.csv")
+    real_path = ds.real_path("out/d.csv")
+    os.remove(real_path)
+
+    ds = DataSource(base, silent=True)
+    assert not ds.exists("out/d.csv")
+    assert len(ds.plan("out/d.csv")) == 1
+    ds.generate("out/d.csv")
+    assert os.path.exists(real_path)
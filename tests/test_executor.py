@@ -0,0 +1,117 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from pyd2m import DataSource
+from pyd2m.executor import RecipeError
+
+RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      '{exp}.csv':
+        FIELDS:
+          - X: int
+    out:
+      all.csv:
+        FIELDS:
+          - X: int
+"""
+
+CB = """
+import pandas as pd
+from pyd2m.cookbook import recipe
+
+
+@recipe(ingredients=["raw/{exp}.csv"], dishes=["out/all.csv"])
+def make_all(cb, frames):
+    return pd.concat(frames, ignore_index=True)
+"""
+
+
+def test_parallel_loads_are_traced(make_dataset):
+    base = make_dataset(RC, CB, {"raw/a.csv": "X\n1\n", "raw/b.csv": "X\n2\n"})
+    ds = DataSource(base, silent=True)
+    assert ds.io_workers > 1
+    ds.generate("out/all.csv")
+    record = ds.manifests.read(ds.real_path("out/all.csv"))
+    assert sorted(record["inputs"]) == ["raw/a.csv", "raw/b.csv"]
+    assert not ds.is_stale("out/all.csv")
+
+    time.sleep(0.01)
+    with open(os.path.join(base, "raw", "a.csv"), "a") as f:
+        f.write("3\n")
+    assert ds.is_stale("out/all.csv")
+    assert len(ds.plan("out/all.csv", rebuild="stale")) == 1
+    ds.generate("out/all.csv", rebuild="stale")
+    assert sorted(ds.load("out/all.csv").X.tolist()) == [1, 2, 3]
+
+
+FAILING_RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      b.csv:
+        FIELDS:
+          - X: int
+    out:
+      c.csv:
+        FIELDS:
+          - X: int
+      d.csv:
+        FIELDS:
+          - X: int
+      e.csv:
+        FIELDS:
+          - X: int
+      all.csv:
+        FIELDS:
+          - X: int
+"""
+
+FAILING_CB = """
+import pandas as pd
+from pyd2m.cookbook import recipe
+
+
+@recipe(ingredients=["raw/b.csv"], dishes=["out/c.csv"])
+def make_c(cb, df):
+    raise ValueError("broken")
+
+
+@recipe(ingredients=["out/c.csv"], dishes=["out/d.csv"])
+def make_d(cb, df):
+    return df
+
+
+@recipe(ingredients=["raw/b.csv"], dishes=["out/e.csv"])
+def make_e(cb, df):
+    return df
+
+
+@recipe(ingredients=["out/d.csv", "out/e.csv"], dishes=["out/all.csv"])
+def make_all(cb, d, e):
+    return pd.concat([d, e], ignore_index=True)
+"""
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failures_are_collected(make_dataset, workers):
+    base = make_dataset(FAILING_RC, FAILING_CB, {"raw/b.csv": "X\n1\n"})
+    ds = DataSource(base, silent=True, workers=workers)
+    with pytest.raises(RecipeError) as info:
+        ds.generate("out/all.csv")
+    assert [step.recipe.procedure.__name__ for step, _ in info.value.failures] == ["make_c"]
+    assert isinstance(info.value.__cause__, ValueError)
+    assert sorted(step.recipe.procedure.__name__ for step in info.value.skipped) == ["make_all", "make_d"]
+    assert ds.exists("out/e.csv")
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from pyd2m import DataSource
+
+RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      vessels.csv:
+        FIELDS:
+          - VesselID: str
+          - Length: int
+      owners.csv:
+        FIELDS:
+          - VesselID: str
+          - Owner: str
+    small:
+      vessels.parquet:
+        TYPE: parquet
+        FIELDS:
+          - VesselID: str
+          - Length: int
+"""
+
+
+def make(make_dataset):
+    vessels = "VesselID,Length\n" + "".join("{},{}\n".format(i, 100 + i) for i in range(42))
+    owners = "VesselID,Owner\n" + "".join("{},o{}\n".format(i, i % 3) for i in range(42))
+    ds = DataSource(make_dataset(RC, files={"raw/vessels.csv": vessels, "raw/owners.csv": owners}), silent=True)
+    ds.dump("small/vessels.parquet", pd.DataFrame({"VesselID": ["0", "1", "2"], "Length": [100, 101, 102]}))
+    return ds
+
+
+def test_base_keeps_declaration_order(make_dataset):
+    ds = make(make_dataset)
+    assert ds.table_stats_of("small/vessels.parquet") is not None
+    assert ds.explain(["VesselID", "Length"]).base.path == "raw/vessels.csv"
+    assert len(ds["VesselID", "Length"]) == 42
+
+
+def test_join_result_does_not_depend_on_stats(make_dataset):
+    ds = make(make_dataset)
+    before = ds["VesselID", "Length", "Owner"]
+    ds.load("raw/owners.csv")
+    ds.load("raw/vessels.csv")
+    after = ds["VesselID", "Length", "Owner"]
+    assert len(before) == 42
+    pd.testing.assert_frame_equal(before.sort_values("VesselID", ignore_index=True),
+                                  after.sort_values("VesselID", ignore_index=True))
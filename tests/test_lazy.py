@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from pyd2m import DataSource
+from pyd2m.lazy import LazyFrame, Frame
+
+from .test_planner import RC
+
+
+def test_keyless_merge_joins_on_common_columns(make_dataset):
+    ds = DataSource(make_dataset(RC), silent=True)
+    left = pd.DataFrame({"k": [1, 2, 3], "A": ["a", "b", "c"]})
+    right = pd.DataFrame({"k": [2, 3, 4], "B": ["x", "y", "z"]})
+    merged = LazyFrame(ds, Frame(left)).merge(right)
+    assert list(merged.columns) == ["k", "A", "B"]
+    pd.testing.assert_frame_equal(merged.collect(), left.merge(right))
+    pd.testing.assert_frame_equal(merged.collect(["A", "B"]), left.merge(right)[["A", "B"]])
+
+    with pytest.raises(ValueError):
+        LazyFrame(ds, Frame(left)).merge(pd.DataFrame({"C": [1]}))
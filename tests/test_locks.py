@@ -0,0 +1,49 @@
+import os
+import time
+
+from pyd2m import DataSource
+from pyd2m.executor import cook_step
+
+from .test_planner import RC
+
+CB = """
+import os
+from pyd2m.cookbook import recipe
+
+
+@recipe(ingredients=["raw/b.csv"], dishes=["out/c.csv"])
+def make_c(cb, df):
+    with open(os.path.join(cb.DS.base, "cooked.log"), "a") as f:
+        f.write("c\\n")
+    return df
+"""
+
+
+def cooked(base):
+    path = os.path.join(base, "cooked.log")
+    return len(open(path).readlines()) if os.path.exists(path) else 0
+
+
+def test_step_finished_elsewhere_is_not_cooked_again(make_dataset):
+    base = make_dataset(RC, CB, {"raw/b.csv": "X\n1\n"})
+    ds = DataSource(base, silent=True)
+    plan = ds.plan("out/c.csv")
+    assert len(plan) == 1
+
+    DataSource(base, silent=True).generate("out/c.csv")
+    assert cooked(base) == 1
+    for step in plan:
+        cook_step(ds, step.recipe, step.vars, step.recheck)
+    assert cooked(base) == 1
+
+
+def test_stale_step_is_still_cooked(make_dataset):
+    base = make_dataset(RC, CB, {"raw/b.csv": "X\n1\n"})
+    ds = DataSource(base, silent=True)
+    ds.generate("out/c.csv")
+    time.sleep(0.01)
+    with open(os.path.join(base, "raw", "b.csv"), "a") as f:
+        f.write("2\n")
+    ds.generate("out/c.csv", rebuild="stale")
+    assert cooked(base) == 2
+    assert ds.load("out/c.csv").X.tolist() == [1, 2]
@@ -0,0 +1,37 @@
+from pyd2m import DataSource
+
+RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      b.csv:
+        FIELDS:
+          - g: int
+          - X: int
+          - Extra: str
+    out:
+      'g_{g}.csv':
+        FREE_FIELDS: True
+        FIELDS:
+          - X: int
+"""
+
+CB = """
+from pyd2m.cookbook import quick_recipe
+
+quick_recipe("groupby", ingredients=["raw/b.csv"], dishes=["out/g_{g}.csv"], field="g")
+"""
+
+
+def test_groups_of_free_fields_dish_keep_their_columns(make_dataset):
+    base = make_dataset(RC, CB, {"raw/b.csv": "g,X,Extra\n1,10,a\n2,20,b\n1,30,c\n"})
+    ds = DataSource(base, silent=True)
+    ds.generate("out/g_{g}.csv")
+    df = ds.load("out/g_1.csv")
+    assert {"g", "X", "Extra"} <= set(df.columns)
+    assert df.X.tolist() == [10, 30]
+    assert df.Extra.tolist() == ["a", "c"]
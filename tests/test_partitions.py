@@ -0,0 +1,41 @@
+from pyd2m import DataSource
+
+RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      '{exp}.csv':
+        FIELDS:
+          - X: int
+    groups:
+      boxes.parquet:
+        TYPE: parquet
+        PARTITION_BY: exp
+        FIELDS:
+          - X: int
+          - exp: str
+"""
+
+CB = """
+from pyd2m.cookbook import recipe
+
+
+@recipe(ingredients=["raw/{exp}.csv"], dishes=["groups/boxes.parquet"])
+def make_boxes(cb, df):
+    return df
+"""
+
+
+def test_second_partition_is_generated(make_dataset):
+    base = make_dataset(RC, CB, {"raw/a.csv": "X\n1\n", "raw/b.csv": "X\n2\n3\n"})
+    ds = DataSource(base, silent=True)
+    assert ds.load("groups/boxes.parquet", exp="a").X.tolist() == [1]
+    assert ds.exists("groups/boxes.parquet", exp="a")
+    assert not ds.exists("groups/boxes.parquet", exp="b")
+    assert len(ds.plan("groups/boxes.parquet", exp="b")) == 1
+    assert ds.load("groups/boxes.parquet", exp="b").X.tolist() == [2, 3]
+    assert sorted(ds.load("groups/boxes.parquet").X.tolist()) == [1, 2, 3]
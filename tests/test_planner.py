@@ -0,0 +1,110 @@
+from pyd2m import DataSource
+from pyd2m.planner import Planner
+
+RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      b.csv:
+        FIELDS:
+          - X: int
+    out:
+      c.csv:
+        FIELDS:
+          - X: int
+      missing.csv:
+        FIELDS:
+          - X: int
+      d.csv:
+        FIELDS:
+          - X: int
+"""
+
+CB = """
+from pyd2m.cookbook import recipe
+
+
+@recipe(ingredients=["raw/b.csv"], dishes=["out/c.csv"])
+def make_c(cb, df):
+    return df
+
+
+@recipe(ingredients=["out/c.csv", "out/missing.csv"], dishes=["out/d.csv"])
+def make_d_from_c(cb, c, missing):
+    return c
+
+
+@recipe(ingredients=["raw/b.csv"], dishes=["out/d.csv"])
+def make_d(cb, df):
+    return df
+"""
+
+
+def test_abandoned_recipe_steps_are_not_planned(make_dataset):
+    base = make_dataset(RC, CB, {"raw/b.csv": "X\n1\n2\n"})
+    ds = DataSource(base, silent=True)
+    plan = ds.plan("out/d.csv")
+    assert [step.recipe.procedure.__name__ for step in plan] == ["make_d"]
+    ds.generate("out/d.csv")
+    assert ds.exists("out/d.csv")
+    assert not ds.exists("out/c.csv")
+
+
+VARIANT_RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    raw:
+      '{exp}.csv':
+        FIELDS:
+          - X: int
+    out:
+      'c_{exp}.csv':
+        FIELDS:
+          - X: int
+      'missing_{exp}.csv':
+        FIELDS:
+          - X: int
+      'd_{exp}.csv':
+        FIELDS:
+          - X: int
+"""
+
+VARIANT_CB = """
+from pyd2m.cookbook import recipe
+
+
+@recipe(ingredients=["raw/{exp}.csv"], dishes=["out/c_{exp}.csv"])
+def make_c(cb, df):
+    return df
+
+
+@recipe(ingredients=["out/c_{exp}.csv", "out/missing_{exp}.csv"], dishes=["out/d_{exp}.csv"])
+def make_d_from_c(cb, c, missing):
+    return c
+
+
+@recipe(ingredients=["raw/{exp}.csv"], dishes=["out/d_{exp}.csv"])
+def make_d(cb, df):
+    return df
+"""
+
+
+def test_generate_all_runs_only_needed_steps(make_dataset):
+    base = make_dataset(VARIANT_RC, VARIANT_CB, {"raw/a.csv": "X\n1\n", "raw/b.csv": "X\n2\n"})
+    ds = DataSource(base, silent=True)
+    variants = [{"exp": "a"}, {"exp": "b"}]
+    plan = Planner(ds).plan_all("out/d_{exp}.csv", variants)
+    assert [(step.recipe.procedure.__name__, step.vars["exp"]) for step in plan] == [("make_d", "a"), ("make_d", "b")]
+
+    ds.generate_all("out/d_{exp}.csv", variants)
+    for exp, x in (("a", 1), ("b", 2)):
+        assert ds.load("out/d_{exp}.csv", exp=exp).X.tolist() == [x]
+        assert not ds.exists("out/c_{exp}.csv", exp=exp)
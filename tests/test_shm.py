@@ -0,0 +1,57 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyd2m import DataSource
+from pyd2m.datasource import shm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RC = """
+- DEFAULTS:
+    TYPE: csv
+    DECLARE_NEW_FIELDS: True
+    LOCAL_FIELDS_ONLY: False
+    FREE_FIELDS: False
+- DATA:
+    mid:
+      x.shm:
+        TYPE: shared_memory
+        FIELDS:
+          - K: int
+          - V: float
+"""
+
+
+def test_import_without_fcntl():
+    code = "import sys; sys.modules['fcntl'] = None; import pyd2m.datasource as d; " \
+           "assert d.shm is None; print('ok')"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert out.stdout.strip() == "ok", out.stderr
+
+
+@pytest.mark.skipif(shm is None, reason="shared_memory store needs a POSIX platform")
+def test_shared_across_pickled_sources(make_dataset):
+    ds = DataSource(make_dataset(RC), silent=True)
+    store = ds.stores["shared_memory"]
+    data = pd.DataFrame({"K": np.arange(5), "V": np.arange(5) * 0.5})
+    ds.dump("mid/x.shm", data)
+
+    worker = pickle.loads(pickle.dumps(ds))
+    assert worker.stores["shared_memory"].session == store.session
+    assert worker.load("mid/x.shm").K.tolist() == list(range(5))
+
+    worker.dump("mid/x.shm", data.head(2))
+    assert ds.load("mid/x.shm").K.tolist() == [0, 1]
+
+    segment = store.segments()[ds.real_path("mid/x.shm")][0]
+    del worker
+    store.close()
+    assert not os.path.exists(store.dir)
+    with pytest.raises(FileNotFoundError):
+        shm.open_segment(segment)
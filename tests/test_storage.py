@@ -0,0 +1,84 @@
+import os
+
+import pandas as pd
+import pytest
+
+from pyd2m import DataSource, storage
+
+from .test_planner import CB, RC
+
+
+@pytest.fixture
+def remote(fs, make_dataset):
+    base = make_dataset(RC, CB, {"raw/b.csv": "X\n1\n2\n3\n"})
+    for root, _, files in os.walk(base):
+        for name in files:
+            path = os.path.join(root, name)
+            fs.put_file(path, "bucket/ds/" + os.path.relpath(path, base).replace(os.sep, "/"))
+    return "mem://bucket/ds"
+
+
+def open_remote(url, tmp_path, name):
+    return DataSource(url, cache_dir=str(tmp_path / name), silent=True)
+
+
+def test_load_and_generate_through_cache(fs, remote, tmp_path):
+    ds = open_remote(remote, tmp_path, "a")
+    assert ds.base.startswith(str(tmp_path / "a"))
+    assert ds.load("raw/b.csv").X.tolist() == [1, 2, 3]
+    ds.generate("out/d.csv")
+    assert "bucket/ds/out/d.csv" in fs.files
+
+    other = open_remote(remote, tmp_path, "b")
+    assert other.exists("out/d.csv")
+    assert len(other.plan("out/d.csv")) == 0
+    assert other.load("out/d.csv").X.tolist() == [1, 2, 3]
+
+
+def test_warm_cache_skips_remote_reads(fs, remote, tmp_path):
+    open_remote(remote, tmp_path, "a").load("raw/b.csv")
+    reads = fs.reads
+    assert open_remote(remote, tmp_path, "a").load("raw/b.csv").X.tolist() == [1, 2, 3]
+    assert fs.reads == reads
+
+
+def test_remote_deletion_is_seen(fs, remote, tmp_path):
+    a = open_remote(remote, tmp_path, "a")
+    b = open_remote(remote, tmp_path, "b")
+    a.generate("out/d.csv")
+    assert b.load("out/d.csv").X.tolist() == [1, 2, 3]
+    local = b.real_path("out/d.csv")
+
+    a.delete("out/d.csv")
+    assert "bucket/ds/out/d.csv" not in fs.files
+    assert not b.exists("out/d.csv")
+    assert not os.path.exists(local)
+
+
+def test_remote_replacement_is_seen(fs, remote, tmp_path):
+    a = open_remote(remote, tmp_path, "a")
+    b = open_remote(remote, tmp_path, "b")
+    a.generate("out/d.csv")
+    assert b.load("out/d.csv").X.tolist() == [1, 2, 3]
+    a.dump("out/d.csv", pd.DataFrame({"X": [7]}))
+    assert b.load("out/d.csv").X.tolist() == [7]
+
+
+def test_large_files_are_read_in_ranges(fs, tmp_path):
+    payload = os.urandom(10000)
+    fs.pipe_file("bucket/ds/big.bin", payload)
+    store = storage.Storage("mem://bucket/ds", cache_dir=str(tmp_path / "c"), range_size=1000, range_workers=4)
+    local = os.path.join(store.local_root, "big.bin")
+    reads = fs.reads
+    assert store.fetch(local)
+    assert fs.reads - reads == 10
+    with open(local, "rb") as f:
+        assert f.read() == payload
+
+
+def test_glob_matches_directories(fs):
+    fs.pipe_file("b/ds/run_1/x.csv", b"")
+    fs.pipe_file("b/ds/run_2/sub/x.csv", b"")
+    assert fs.glob("b/ds/*/x.csv") == ["b/ds/run_1/x.csv"]
+    assert fs.glob("b/ds/**/x.csv") == ["b/ds/run_1/x.csv", "b/ds/run_2/sub/x.csv"]
+    assert fs.glob("b/ds/run_*") == ["b/ds/run_1", "b/ds/run_2"]
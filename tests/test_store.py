@@ -0,0 +1,34 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pyd2m import store
+
+
+def test_msgpack_stream_concurrent_dumps(tmp_path):
+    data_store = store.DSMsgpackStream()
+    frames = [pd.DataFrame({"A": np.arange(500) + i, "B": ["s{}_{}".format(i, j) for j in range(500)],
+                            "C": [np.int64(j) if j % 2 else pd.Timestamp(j, unit="s") for j in range(500)]})
+              for i in range(32)]
+
+    def dump(i):
+        path = os.path.join(str(tmp_path), "{}.msg".format(i))
+        data_store.dump(path, frames[i], None)
+        return path
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(5):
+            with ThreadPoolExecutor(16) as pool:
+                paths = list(pool.map(dump, range(32)))
+    finally:
+        sys.setswitchinterval(interval)
+    for i, path in enumerate(paths):
+        loaded = data_store.load(path, None)
+        assert loaded.A.tolist() == frames[i].A.tolist()
+        assert loaded.B.tolist() == frames[i].B.tolist()
+        assert len(loaded.C) == len(frames[i].C)